@@ -39,7 +39,7 @@ install_dependencies() {
     
     # 安装Python依赖
     echo -e "${CYAN}安装Python依赖...${NC}"
-    pip install requests beautifulsoup4 tenacity aiohttp treelib
+    pip install requests beautifulsoup4 tenacity aiohttp treelib lxml
     
     # 安装系统依赖
     echo -e "${CYAN}安装系统依赖...${NC}"
@@ -149,25 +149,16 @@ test_auto_share() {
         return
     fi
     
-    if [ ! -d "./auto" ]; then
-        echo -e "${RED}错误：找不到 auto 目录${NC}"
+    if [ ! -d "./kua-main" ]; then
+        echo -e "${RED}错误：找不到 kua-main 目录${NC}"
         return
     fi
     
-    cd ./auto
-    echo -e "${CYAN}执行同步目录...${NC}"
-    php ./QuarkService.php --options syn_dir --fid ${fid} || {
-        echo -e "${RED}QuarkService.php syn_dir 执行失败${NC}"
-    }
-    sleep 2
-    sudo chown root:root quark-dir-${fid}.txt || echo "更改dir文件所有者失败"
-    
+    cd ./kua-main
     echo -e "${CYAN}执行分享...${NC}"
-    php ./QuarkService.php --options share --fid ${fid} --type 'repeat' || {
-        echo -e "${RED}QuarkService.php share 执行失败${NC}"
+    python3 quark_share.py quark_config.json --fid ${fid} || {
+        echo -e "${RED}quark_share.py 执行失败${NC}"
     }
-    sleep 2
-    sudo chown root:root quark-share-${fid}.txt || echo "更改share文件所有者失败"
     
     cd "$current_dir"
     echo -e "${GREEN}自动分享测试完成${NC}"
@@ -0,0 +1,65 @@
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+from bs4 import BeautifulSoup
+import parsers
+
+# 随代码提交的样本页面，结构与 ddys 的列表页和影片页一致，用于复现对比结果
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_samples')
+
+
+def parse_movie_full_soup(html):
+    """
+    原来的解析方式：完整构建 BeautifulSoup 树，对全文做三次 re.findall。
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    title_tag = soup.find('h1', class_='post-title')
+    if not title_tag:
+        return None
+    all_text = soup.get_text(separator='\n')
+    pan_links = {}
+    for pan_type, pattern in {
+        '夸克': r'https://pan\.quark\.cn/s/\w+',
+        '百度': r'https://pan\.baidu\.com/s/[\w\-]+\?pwd=[\w\d]+',
+        'uc': r'https://drive\.uc\.cn/s/\w+'
+    }.items():
+        matches = re.findall(pattern, all_text)
+        if matches:
+            pan_links[pan_type] = matches[0]
+    return title_tag.text.strip(), pan_links
+
+
+def bench(name, func, pages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            func(html)
+    elapsed = time.perf_counter() - start
+    per_page = elapsed / (rounds * len(pages)) * 1000
+    print(f"{name:<12} {per_page:8.3f} ms/页")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='影片页面解析后端性能对比')
+    parser.add_argument('samples', nargs='*', help='样本页面文件，默认使用 bench_samples 中的页面，也可以指定 http_cache/*.html.gz')
+    parser.add_argument('--rounds', type=int, default=5, help='每个样本重复解析的次数')
+    args = parser.parse_args()
+
+    paths = args.samples or sorted(glob.glob(os.path.join(SAMPLE_DIR, '*.html')))
+    pages = [parsers.load_sample(path) for path in paths]
+    pages = [html for html in pages if b'post-title' in html]
+    if not pages:
+        print("没有找到影片页面样本，请指定样本文件。")
+        sys.exit(1)
+
+    print(f"样本页面: {len(pages)} 个，重复 {args.rounds} 次")
+    bench('full-soup', parse_movie_full_soup, pages, args.rounds)
+    for backend in parsers.available_backends():
+        bench(backend, lambda html: parsers.parse_movie(html, backend), pages, args.rounds)
+
+
+if __name__ == '__main__':
+    main()
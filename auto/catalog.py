@@ -0,0 +1,284 @@
+import os
+import re
+import json
+import time
+import unicodedata
+
+# 影片目录文件：每行一条 JSON 记录，爬取、格式转换、链接替换、有效性检查和生成页面都读写这个文件
+CATALOG_FILE = 'catalog.jsonl'
+
+DOUBAN_ID_PATTERN = re.compile(r'/subject/(\d+)')
+
+# 影片名称中的附加信息：年份、清晰度、字幕组等，放在各种括号里
+BRACKET_PATTERN = re.compile(r'\([^)]*\)|\[[^\]]*\]|【[^】]*】')
+# 季数：第二季、第2季、Season 2、S02
+SEASON_PATTERN = re.compile(r'第\s*([0-9零一二两三四五六七八九十]+)\s*季|season\s*(\d+)|(?<![a-z])s(\d{1,2})(?!\d)')
+CHINESE_DIGITS = {'零': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+
+
+def clean_title(title):
+    """
+    移除影片名称中的括号及其内容（包括全角括号），用作任务名称和保存目录。
+    """
+    return re.sub(r'\s*[(（][^)）]*[)）]', '', title).strip()
+
+
+def _season_number(text):
+    if text.isdigit():
+        return int(text)
+    # 中文数字：十、十二、二十、二十三
+    tens, _, ones = text.partition('十')
+    if not _:
+        return CHINESE_DIGITS.get(text, 0)
+    return CHINESE_DIGITS.get(tens, 1) * 10 + CHINESE_DIGITS.get(ones, 0)
+
+
+def normalize_title(title):
+    """
+    影片名称的匹配键，各个步骤之间按这个键关联影片：
+    全角转半角、去掉括号及其内容和书名号、季数统一为 s<N>、去掉空白并转为小写。
+    """
+    title = unicodedata.normalize('NFKC', title or '').lower()
+    title = BRACKET_PATTERN.sub(' ', title)
+    title = title.replace('《', '').replace('》', '')
+    title = SEASON_PATTERN.sub(
+        lambda m: f" s{_season_number(m.group(1) or m.group(2) or m.group(3))} ", title
+    )
+    return re.sub(r'\s+', '', title)
+
+
+def title_key(record):
+    """
+    目录记录的匹配键，兼容没有 title_key 字段的旧记录。
+    """
+    return record.get('title_key') or normalize_title(record['title'])
+
+
+def extract_douban_id(douban_link):
+    match = DOUBAN_ID_PATTERN.search(douban_link or '')
+    return match.group(1) if match else ''
+
+
+def movie_record(source_url, title, pan_links, douban_link):
+    """
+    一个影片的目录记录，pan_links 以网盘名称（夸克、百度、uc）为键。
+    """
+    now = int(time.time())
+    return {
+        'type': 'movie',
+        'title': title,
+        'clean_title': clean_title(title),
+        'title_key': normalize_title(title),
+        'pan_links': pan_links or {},
+        'douban_link': douban_link or '',
+        'douban_id': extract_douban_id(douban_link),
+        'source_url': source_url,
+        'crawled_at': now,
+        'updated_at': now
+    }
+
+
+def published_links(record):
+    """
+    对外发布的网盘链接：pan_links 是爬取到的原始链接，share_links 是自动分享替换后的自有链接，
+    两者分开保存，爬取和生成任务只使用 pan_links，页面和链接检查使用替换后的链接。
+    """
+    return dict(record['pan_links'], **record.get('share_links', {}))
+
+
+def failed_record(source_url):
+    """
+    无法访问的影片页面记录。
+    """
+    return {'type': 'failed', 'source_url': source_url, 'crawled_at': int(time.time())}
+
+
+def title_index_path(path):
+    """
+    目录对应的名称索引文件：匹配键 -> 影片名称和来源地址，随目录一起写入。
+    """
+    return f"{path}.titles.json"
+
+
+def load_title_index(path=CATALOG_FILE):
+    """
+    读取目录的名称索引，不存在时返回空字典。
+    """
+    try:
+        with open(title_index_path(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def partial_path(path):
+    """
+    正在写入的目录文件，写完后改名为 path。
+    """
+    return f"{path}.partial"
+
+
+def _parse_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        # 写入中断时最后一行可能只写了一半
+        return None
+
+
+def read_catalog(path=CATALOG_FILE, record_type=None, follow=False):
+    """
+    逐行读取目录，返回记录的生成器，record_type 不为空时只返回该类型的记录。
+    follow 为真时读取正在写入的目录，边写边读，直到写入完成。
+    """
+    lines = _follow_lines(path) if follow else _read_lines(path)
+    for line in lines:
+        record = _parse_line(line)
+        if record is None or record.get('type') == 'end':
+            continue
+        if record_type is None or record.get('type') == record_type:
+            yield record
+
+
+def iter_movies(path=CATALOG_FILE, follow=False):
+    return read_catalog(path, 'movie', follow)
+
+
+def _read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from f
+
+
+def _follow_lines(path, poll_interval=1.0):
+    """
+    跟随读取正在写入的目录：读到结束标记为止；写入被放弃（临时文件被删除）时也会结束。
+    没有正在写入的目录时读取已完成的目录。
+    """
+    try:
+        f = open(partial_path(path), 'r', encoding='utf-8')
+    except FileNotFoundError:
+        yield from _read_lines(path)
+        return
+    with f:
+        pending = ''
+        while True:
+            line = f.readline()
+            if line:
+                pending += line
+                if not pending.endswith('\n'):
+                    # 读到了写了一半的行，等写完再处理
+                    continue
+                record = _parse_line(pending)
+                yield pending
+                pending = ''
+                if record and record.get('type') == 'end':
+                    return
+            elif os.path.exists(partial_path(path)):
+                time.sleep(poll_interval)
+            else:
+                # 文件已改名或被删除，读完剩余内容后结束
+                rest = f.read()
+                if rest:
+                    yield from (pending + rest).splitlines(keepends=True)
+                return
+
+
+class CatalogWriter:
+    """
+    目录写入器：逐条追加到 path.partial，close 时写入结束标记并改名为 path，
+    中途出错时删除 path.partial，保留原来的目录。
+    live 为真时每条记录立即写到磁盘，其他程序可以用 read_catalog(follow=True) 边写边读。
+    内存中只保留已写入记录的来源地址（urls），close 时再读一遍写好的文件生成名称索引。
+    """
+    def __init__(self, path=CATALOG_FILE, live=False):
+        self.path = path
+        self.tmp_path = partial_path(path)
+        self.count = 0
+        self.urls = set()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.tmp_path, 'w', encoding='utf-8', buffering=1 if live else -1)
+
+    def write(self, record):
+        """
+        写入一条记录，返回写入的 JSON 文本。
+        """
+        line = json.dumps(record, ensure_ascii=False)
+        self.file.write(line + '\n')
+        self.count += 1
+        self.urls.add(record.get('source_url'))
+        return line
+
+    def close(self):
+        self.file.write(json.dumps({'type': 'end', 'count': self.count, 'finished_at': int(time.time())}) + '\n')
+        self.file.close()
+        self._write_title_index()
+        os.replace(self.tmp_path, self.path)
+
+    def _write_title_index(self):
+        """
+        逐条读取写好的目录生成名称索引并逐项写出，同一个匹配键以第一个影片为准。
+        """
+        index_path = title_index_path(self.path)
+        tmp_index_path = f"{index_path}.{os.getpid()}.tmp"
+        keys = set()
+        with open(tmp_index_path, 'w', encoding='utf-8') as f:
+            f.write('{')
+            for record in read_catalog(self.tmp_path, 'movie'):
+                key = title_key(record)
+                if key in keys:
+                    continue
+                entry = {
+                    'title': record['title'],
+                    'clean_title': record['clean_title'],
+                    'source_url': record['source_url']
+                }
+                f.write(f"{', ' if keys else ''}{json.dumps(key, ensure_ascii=False)}: {json.dumps(entry, ensure_ascii=False)}")
+                keys.add(key)
+            f.write('}')
+        os.replace(tmp_index_path, index_path)
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def rewrite_catalog(update, path=CATALOG_FILE):
+    """
+    一遍读取目录，每条记录交给 update(record) 处理后写入新文件，update 返回 None 时删除该记录。
+    返回修改的记录数，没有任何修改时放弃写入，保留原文件。
+    """
+    changed = 0
+    writer = CatalogWriter(path)
+    try:
+        for line in _read_lines(path):
+            record = _parse_line(line)
+            if record is None or record.get('type') == 'end':
+                continue
+            record = update(record)
+            if record is None:
+                changed += 1
+                continue
+            if writer.write(record) != line.strip():
+                changed += 1
+    except BaseException:
+        writer.abort()
+        raise
+    if changed:
+        writer.close()
+    else:
+        writer.abort()
+    return changed
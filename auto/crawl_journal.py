@@ -0,0 +1,53 @@
+import os
+import json
+import logging
+
+
+class CrawlJournal:
+    """
+    爬取检查点日志：每完成一个列表页或影片页就追加一行记录，
+    进程中途退出后可以从日志恢复，已完成的页面不再重新爬取。
+    记录只追加到日志文件，不在内存中保留；只有 resume 时才把日志中的结果读入 pages 和 movies。
+    """
+    def __init__(self, path='crawl_journal.jsonl', resume=False):
+        self.path = path
+        self.pages = {}   # 恢复的列表页地址 -> 影片链接列表
+        self.movies = {}  # 恢复的影片链接 -> 提取结果
+        if resume:
+            self.load()
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+
+    def load(self):
+        if not os.path.exists(self.path):
+            logging.info(f"没有找到检查点日志 {self.path}，从头开始爬取。")
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 进程被杀死时最后一行可能只写了一半
+                    continue
+                if record['type'] == 'page':
+                    self.pages[record['page']] = record['links']
+                elif record['type'] == 'movie':
+                    self.movies[record['url']] = tuple(record['result'])
+        logging.info(f"从检查点恢复：{len(self.pages)} 个列表页，{len(self.movies)} 个影片页。")
+
+    def _append(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def add_page(self, page_url, links):
+        self._append({'type': 'page', 'page': page_url, 'links': links})
+
+    def add_movie(self, url, result):
+        self._append({'type': 'movie', 'url': url, 'result': list(result)})
+
+    def close(self, finished=False):
+        """
+        关闭日志，爬取完整结束时删除日志文件。
+        """
+        self.file.close()
+        if finished:
+            os.remove(self.path)
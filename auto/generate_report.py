@@ -2,7 +2,10 @@ import re
 import aiohttp
 import asyncio
 import os
-from bs4 import BeautifulSoup
+import parsers
+from parsers import ParsePool
+from proxy_pool import ProxyPool
+from catalog import CATALOG_FILE, read_catalog, iter_movies, normalize_title, title_key, load_title_index, title_index_path, published_links
 import time
 import random
 import json
@@ -41,11 +44,14 @@ class Movie:
             return f"name_{hashlib.md5(self.name.encode('utf-8')).hexdigest()}"
 
     def get_base_name(self):
-        """获取不包含括号内容的基本名称"""
-        return re.sub(r'\([^)]*\)', '', self.name).strip()
-
-    async def fetch_douban_image(self, session, headers, cache_dir, max_retries=3, retry_delay=5):
-        """异步获取豆瓣图片链接，带重试机制和缓存"""
+        """获取名称匹配键，用于和上一次的电影列表、检查结果关联"""
+        return normalize_title(self.name)
+
+    async def fetch_douban_image(self, session, headers, cache_dir, max_retries=3, retry_delay=5, parse_pool=None,
+                                 proxies=None):
+        """异步获取豆瓣图片链接，带重试机制和缓存，页面解析交给解析进程池，请求分散到出口池"""
+        parse_pool = parse_pool or ParsePool(0)
+        proxies = proxies or ProxyPool()
         cache_file = Path(cache_dir) / f"{self.cache_key}.json"
 
         if cache_file.exists():
@@ -74,29 +80,32 @@ class Movie:
                     'Cache-Control': 'max-age=0'
                 })
 
-                async with session.get(self.douban_link, headers=headers, timeout=10) as response:
+                proxy = proxies.choose()
+                start_time = time.monotonic()
+                try:
+                    response = await session.get(self.douban_link, headers=headers, timeout=10, proxy=proxy.url)
+                except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                    proxies.report_failure(proxy, type(e).__name__)
+                    raise
+                async with response:
                     if response.status != 200:
+                        if response.status in (403, 407, 429) or response.status >= 500:
+                            proxies.report_failure(proxy, f"HTTP {response.status}")
                         raise Exception(f"HTTP {response.status}")
 
                     if 'sec.douban.com' in str(response.url):
+                        # 当前出口被要求安全验证，有其他出口时换一个重试
+                        proxies.report_failure(proxy, '豆瓣安全验证')
+                        if len(proxies.members) > 1 and retry < max_retries - 1:
+                            raise Exception("出口被豆瓣要求安全验证")
                         self.image_url = 'data:image/svg+xml;base64,PHN2ZyB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHdpZHRoPSIyMDAiIGhlaWdodD0iMzAwIj48cmVjdCB3aWR0aD0iMjAwIiBoZWlnaHQ9IjMwMCIgZmlsbD0iI2VlZSIvPjx0ZXh0IHg9IjUwJSIgeT0iNTAlIiBmb250LWZhbWlseT0iQXJpYWwiIGZvbnQtc2l6ZT0iMTQiIGZpbGw9IiM5OTkiIHRleHQtYW5jaG9yPSJtaWRkbGUiIGR5PSIuM2VtIj7pnIDopoHpqozor4E8L3RleHQ+PC9zdmc+'
                         return
 
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-
-                    img_div = soup.find('div', id='mainpic')
-                    if img_div:
-                        img_tag = img_div.find('img')
-                        if img_tag and 'src' in img_tag.attrs:
-                            self.image_url = img_tag['src']
-                            self._save_to_cache(cache_file)
-                            print(f"已缓存图片: {self.name}")
-                            return
-
-                    sharing_a = soup.find('a', class_='bn-sharing')
-                    if sharing_a and 'data-pic' in sharing_a.attrs:
-                        self.image_url = sharing_a['data-pic']
+                    html = await response.read()
+                    proxies.report_success(proxy, time.monotonic() - start_time)
+                    image_url = await parse_pool.run(parsers.parse_douban_image, html)
+                    if image_url:
+                        self.image_url = image_url
                         self._save_to_cache(cache_file)
                         print(f"已缓存图片: {self.name}")
                         return
@@ -127,8 +136,8 @@ class Movie:
             print(f"保存缓存失败 {self.name}: {str(e)}")
 
 class ReportGenerator:
-    def __init__(self, log_path, output_html, quark_log_path='../kua-main/quark_save.log', cache_dir='./cache'):
-        self.log_path = log_path
+    def __init__(self, catalog_path, output_html, quark_log_path='../kua-main/quark_save.log', cache_dir='./cache'):
+        self.catalog_path = catalog_path
         self.output_html = output_html
         self.quark_log_path = quark_log_path
         self.cache_dir = cache_dir
@@ -137,8 +146,8 @@ class ReportGenerator:
         self.inaccessible_urls = []
         self.violation_movies = []  # 存储违规影片列表
         self.check_result_path = '../kua-main/movie_check_result.log'
-        self.check_results = {}  # 存储检查结果
-        self.previous_movies = set()  # 存储上一次的电影列表
+        self.check_results = {}  # 存储检查结果，名称匹配键 -> 状态
+        self.previous_movies = set()  # 存储上一次的电影列表（名称匹配键）
 
         # 创建缓存目录
         os.makedirs(cache_dir, exist_ok=True)
@@ -166,15 +175,11 @@ class ReportGenerator:
     def load_previous_movies(self):
         """加载上一次的电影列表"""
         try:
-            if os.path.exists(self.log_path + '.bak'):
-                with open(self.log_path + '.bak', 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    movie_pattern = re.compile(r'影片名称:\s*(.*?)\n', re.DOTALL)
-                    for match in movie_pattern.finditer(content):
-                        name = match.group(1).strip()
-                        # 存储不带括号的基本名称
-                        base_name = re.sub(r'\([^)]*\)', '', name).strip()
-                        self.previous_movies.add(base_name)
+            # 优先使用上一次的名称索引，没有时读取上一次的目录
+            self.previous_movies = set(load_title_index(self.catalog_path + '.bak'))
+            if not self.previous_movies and os.path.exists(self.catalog_path + '.bak'):
+                for record in iter_movies(self.catalog_path + '.bak'):
+                    self.previous_movies.add(title_key(record))
         except Exception as e:
             print(f"加载上一次电影列表失败: {str(e)}")
 
@@ -190,11 +195,11 @@ class ReportGenerator:
                     if len(parts) >= 3:
                         name = parts[0].strip()
                         status = parts[2].strip()
-                        self.check_results[name] = status
+                        self.check_results[normalize_title(name)] = status
 
             # 更新电影状态
             for movie in self.movies:
-                movie.status = self.check_results.get(movie.name, '无效')
+                movie.status = self.check_results.get(movie.get_base_name(), '无效')
 
         except Exception as e:
             print(f"解析检查结果失败: {str(e)}")
@@ -202,39 +207,21 @@ class ReportGenerator:
     def parse_log(self):
         self.load_previous_movies()  # 先加载上一次的电影列表
 
-        with open(self.log_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-
-        inaccessible_section = re.search(
-            r'无法访问的影片页面列表（404或其他错误）:\n((?:- .+\n)*)',
-            content,
-            re.MULTILINE
-        )
-        if inaccessible_section:
-            self.inaccessible_urls = re.findall(r'- (.+)', inaccessible_section.group(1))
-        else:
-            self.inaccessible_urls = []
-
-        total_match = re.search(r'总影片数量:\s*(\d+)', content)
-        self.total_movies = int(total_match.group(1)) if total_match else 0
-
-        movie_pattern = re.compile(
-            r'影片名称:\s*(.*?)\n'
-            r'(?:\s+夸克网盘链接:\s*(.*?)\n)?'
-            r'(?:\s+百度网盘链接:\s*(.*?)\n)?'
-            r'(?:\s+uc网盘链接:\s*(.*?)\n)?'
-            r'\s+豆瓣链接:\s*(.*?)(?:\n|$)',
-            re.DOTALL
-        )
-
-        for match in movie_pattern.finditer(content):
-            name, quark, baidu, uc, douban = match.groups()
+        # 逐条读取影片目录
+        self.inaccessible_urls = []
+        self.total_movies = 0
+        for record in read_catalog(self.catalog_path):
+            if record['type'] == 'failed':
+                self.inaccessible_urls.append(record['source_url'])
+                continue
+            self.total_movies += 1
+            pan_links = published_links(record)
             movie = Movie(
-                name=name.strip(),
-                quark_link=quark.strip() if quark else '',
-                baidu_link=baidu.strip() if baidu else '',
-                uc_link=uc.strip() if uc else '',
-                douban_link=douban.strip() if douban else ''
+                name=record['title'],
+                quark_link=pan_links.get('夸克', ''),
+                baidu_link=pan_links.get('百度', ''),
+                uc_link=pan_links.get('uc', ''),
+                douban_link=record['douban_link']
             )
             # 检查是否为新增电影
             base_name = movie.get_base_name()
@@ -244,11 +231,13 @@ class ReportGenerator:
 
             self.movies.append(movie)
 
-        # 备份当前的日志文件
+        # 备份当前的影片目录
         try:
-            shutil.copy2(self.log_path, self.log_path + '.bak')
+            shutil.copy2(self.catalog_path, self.catalog_path + '.bak')
+            if os.path.exists(title_index_path(self.catalog_path)):
+                shutil.copy2(title_index_path(self.catalog_path), title_index_path(self.catalog_path + '.bak'))
         except Exception as e:
-            print(f"备份日志文件失败: {str(e)}")
+            print(f"备份影片目录失败: {str(e)}")
 
     def parse_quark_log(self):
         """解析夸克日志文件，提取违规影片"""
@@ -288,14 +277,21 @@ class ReportGenerator:
         }
 
         connector = aiohttp.TCPConnector(limit=5)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            tasks = []
-            for movie in self.movies:
-                headers['User-Agent'] = random.choice(user_agents)
-                task = movie.fetch_douban_image(session, headers.copy(), self.cache_dir)
-                tasks.append(task)
+        proxies = ProxyPool.from_config(name='douban')
+        with ParsePool(os.cpu_count() or 1) as parse_pool:
+            async with aiohttp.ClientSession(connector=connector) as session:
+                tasks = []
+                for movie in self.movies:
+                    # 没有豆瓣链接的影片无法获取海报
+                    if not movie.douban_link:
+                        continue
+                    headers['User-Agent'] = random.choice(user_agents)
+                    task = movie.fetch_douban_image(session, headers.copy(), self.cache_dir, parse_pool=parse_pool,
+                                                    proxies=proxies)
+                    tasks.append(task)
 
-            await asyncio.gather(*tasks)
+                await asyncio.gather(*tasks)
+        print(f"出口状态: {proxies.stats()}")
     def _generate_violation_section(self):
         """生成违规影片和无法访问URL展示区域的HTML"""
         # 违规影片部分
@@ -689,5 +685,5 @@ class ReportGenerator:
 
 
 if __name__ == "__main__":
-    generator = ReportGenerator(log_path='./report.log', output_html='../index.html')
+    generator = ReportGenerator(catalog_path=CATALOG_FILE, output_html='../index.html')
     asyncio.run(generator.run())
\ No newline at end of file
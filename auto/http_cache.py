@@ -0,0 +1,91 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+
+
+class CacheMiss(Exception):
+    """
+    离线模式下缓存中没有对应页面。
+    """
+
+
+class HttpCache:
+    """
+    按URL缓存的页面响应，保存 ETag/Last-Modified 和 gzip 压缩后的页面内容，
+    以及页面的解析结果。页面内容按原始字节保存。offline 为 True 时只从缓存读取，不访问网络。
+    """
+    def __init__(self, cache_dir='http_cache', offline=False):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.html.gz'
+
+    def _load_meta(self, url):
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_meta(self, url, meta):
+        meta_path, _ = self._paths(url)
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def conditional_headers(self, url):
+        """
+        返回重新验证用的请求头 If-None-Match / If-Modified-Since。
+        """
+        meta = self._load_meta(url)
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def load_body(self, url):
+        _, body_path = self._paths(url)
+        try:
+            with gzip.open(body_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            raise CacheMiss(url)
+
+    def store(self, url, headers, body):
+        """
+        保存响应内容和验证信息，内容变化后旧的解析结果作废。
+        """
+        _, body_path = self._paths(url)
+        tmp_path = f"{body_path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, body_path)
+        self._save_meta(url, {
+            'url': url,
+            'etag': headers.get('ETag', ''),
+            'last_modified': headers.get('Last-Modified', ''),
+            'fetched_at': int(time.time()),
+            'parsed': None
+        })
+
+    def get_parsed(self, url):
+        meta = self._load_meta(url)
+        return meta.get('parsed') if meta else None
+
+    def set_parsed(self, url, parsed):
+        meta = self._load_meta(url)
+        if meta is None:
+            return
+        meta['parsed'] = parsed
+        self._save_meta(url, meta)
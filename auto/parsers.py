@@ -0,0 +1,280 @@
+import os
+import re
+import gzip
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+# 可选的解析后端：优先使用 selectolax，其次 lxml，都没有安装时使用 BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:
+    lxml = None
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# 网盘链接的合并正则，一次扫描同时匹配三种网盘
+PAN_PATTERN = re.compile(
+    r'(?P<quark>https://pan\.quark\.cn/s/\w+)'
+    r'|(?P<baidu>https://pan\.baidu\.com/s/[\w\-]+\?pwd=[\w\d]+)'
+    r'|(?P<uc>https://drive\.uc\.cn/s/\w+)'
+)
+PAN_TYPES = {'quark': '夸克', 'baidu': '百度', 'uc': 'uc'}
+DOUBAN_PATTERN = re.compile(r'https://movie\.douban\.com/subject/\d+')
+
+# 文章正文所在的元素，按顺序查找，找不到时扫描整个页面
+ARTICLE_CLASSES = ('entry', 'post-content', 'entry-content')
+
+
+def available_backends():
+    backends = []
+    if HTMLParser is not None:
+        backends.append('selectolax')
+    if lxml is not None:
+        backends.append('lxml')
+    backends.append('bs4')
+    return backends
+
+
+# 可通过环境变量 SCRAPER_PARSER 指定后端
+DEFAULT_BACKEND = os.environ.get('SCRAPER_PARSER') or available_backends()[0]
+
+
+def find_pan_links(chunks):
+    """
+    用合并正则扫描文本片段，每种网盘取第一个匹配的链接。
+    """
+    pan_links = {}
+    for match in PAN_PATTERN.finditer('\n'.join(chunks)):
+        pan_type = PAN_TYPES[match.lastgroup]
+        if pan_type not in pan_links:
+            pan_links[pan_type] = match.group()
+            if len(pan_links) == len(PAN_TYPES):
+                break
+    # 保持与网盘类型定义一致的顺序
+    return {name: pan_links[name] for name in PAN_TYPES.values() if name in pan_links}
+
+
+def _to_text(html):
+    """
+    页面以原始字节传入解析进程，在这里解码。
+    """
+    if isinstance(html, bytes):
+        return html.decode('utf-8', errors='replace')
+    return html
+
+
+# lxml 直接解析原始字节并按 UTF-8 解码：字符串带有 XML 编码声明时 lxml 会报错
+LXML_PARSER = lxml.html.HTMLParser(encoding='utf-8') if lxml is not None else None
+
+
+def _lxml_document(html):
+    """
+    用 lxml 解析页面，空页面（lxml 报 Document is empty）返回 None。
+    """
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+    try:
+        return lxml.html.fromstring(html, parser=LXML_PARSER)
+    except lxml.etree.ParserError:
+        return None
+
+
+def _xpath_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def parse_listing(html, backend=None):
+    """
+    从影片展示页面提取所有影片链接。
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == 'lxml':
+        doc = _lxml_document(html)
+        if doc is None:
+            return []
+        return doc.xpath(
+            f"//div[{_xpath_class('post-box-container')}]"
+            f"//h2[{_xpath_class('post-box-title')}]//a/@href"
+        )
+    html = _to_text(html)
+    if backend == 'selectolax':
+        tree = HTMLParser(html)
+        return [
+            node.attributes['href']
+            for node in tree.css('div.post-box-container h2.post-box-title a')
+            if node.attributes.get('href')
+        ]
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('div', class_='post-box-container'))
+    movie_links = []
+    for container in soup.find_all('div', class_='post-box-container'):
+        title_tag = container.find('h2', class_='post-box-title')
+        a_tag = title_tag.find('a') if title_tag else None
+        if a_tag and a_tag.get('href'):
+            movie_links.append(a_tag['href'])
+    return movie_links
+
+
+def parse_movie(html, backend=None):
+    """
+    从影片页面提取 (title, pan_links, douban_link)，缺少标题时返回 None。
+    只解析标题、文章正文和豆瓣信息块。
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == 'lxml':
+        return _parse_movie_lxml(html)
+    html = _to_text(html)
+    if backend == 'selectolax':
+        return _parse_movie_selectolax(html)
+    return _parse_movie_bs4(html)
+
+
+def _parse_movie_selectolax(html):
+    tree = HTMLParser(html)
+    title_tag = tree.css_first('h1.post-title')
+    if title_tag is None:
+        return None
+    title = title_tag.text().strip()
+
+    body = None
+    for name in ARTICLE_CLASSES:
+        body = tree.css_first(f'div.{name}')
+        if body is not None:
+            break
+    body = body or tree.css_first('article') or tree.body or tree.root
+    chunks = [node.attributes.get('href') or '' for node in body.css('a')]
+    chunks.append(body.text(separator='\n'))
+    pan_links = find_pan_links(chunks)
+
+    douban_link = ""
+    mod_div = tree.css_first('div.mod')
+    if mod_div is not None:
+        for a_tag in mod_div.css('div.doulist-subject div.title a'):
+            href = a_tag.attributes.get('href') or ''
+            if DOUBAN_PATTERN.search(href):
+                douban_link = href.strip()
+                break
+    return title, pan_links, douban_link
+
+
+def _parse_movie_lxml(html):
+    doc = _lxml_document(html)
+    if doc is None:
+        return None
+    title_tags = doc.xpath(f"//h1[{_xpath_class('post-title')}]")
+    if not title_tags:
+        return None
+    title = title_tags[0].text_content().strip()
+
+    body = None
+    for name in ARTICLE_CLASSES:
+        found = doc.xpath(f"//div[{_xpath_class(name)}]")
+        if found:
+            body = found[0]
+            break
+    if body is None:
+        found = doc.xpath('//article')
+        body = found[0] if found else doc
+    chunks = body.xpath('.//a/@href')
+    chunks.append('\n'.join(body.itertext()))
+    pan_links = find_pan_links(chunks)
+
+    douban_link = ""
+    mod_divs = doc.xpath(f"//div[{_xpath_class('mod')}]")
+    if mod_divs:
+        hrefs = mod_divs[0].xpath(
+            f".//div[{_xpath_class('doulist-subject')}]//div[{_xpath_class('title')}]//a/@href"
+        )
+        for href in hrefs:
+            if DOUBAN_PATTERN.search(href):
+                douban_link = href.strip()
+                break
+    return title, pan_links, douban_link
+
+
+def _parse_movie_bs4(html):
+    soup = BeautifulSoup(html, 'lxml' if lxml is not None else 'html.parser')
+    title_tag = soup.find('h1', class_='post-title')
+    if not title_tag:
+        return None
+    title = title_tag.text.strip()
+
+    body = None
+    for name in ARTICLE_CLASSES:
+        body = soup.find('div', class_=name)
+        if body:
+            break
+    body = body or soup.find('article') or soup
+    chunks = [a_tag.get('href', '') for a_tag in body.find_all('a')]
+    chunks.append(body.get_text(separator='\n'))
+    pan_links = find_pan_links(chunks)
+
+    douban_link = ""
+    mod_div = soup.find('div', class_='mod')
+    if mod_div:
+        doulist_subj_div = mod_div.find('div', class_='doulist-subject')
+        title_div = doulist_subj_div.find('div', class_='title') if doulist_subj_div else None
+        a_tag = title_div.find('a', href=DOUBAN_PATTERN) if title_div else None
+        if a_tag:
+            douban_link = a_tag['href'].strip()
+    return title, pan_links, douban_link
+
+
+def parse_douban_image(html):
+    """
+    从豆瓣影片页面提取海报图片链接，找不到时返回空字符串。
+    """
+    soup = BeautifulSoup(_to_text(html), 'lxml' if lxml is not None else 'html.parser')
+    img_div = soup.find('div', id='mainpic')
+    if img_div:
+        img_tag = img_div.find('img')
+        if img_tag and 'src' in img_tag.attrs:
+            return img_tag['src']
+    sharing_a = soup.find('a', class_='bn-sharing')
+    if sharing_a and 'data-pic' in sharing_a.attrs:
+        return sharing_a['data-pic']
+    return ''
+
+
+class ParsePool:
+    """
+    页面解析进程池的异步接口：抓取协程把原始字节交给子进程解析，只取回提取结果，
+    网络并发和解析CPU分开扩展。workers 为 0 时直接在当前进程中解析。
+    """
+    def __init__(self, workers=None):
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers != 0 else None
+
+    async def run(self, func, *args):
+        if self.executor is None:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_sample(path):
+    """
+    读取样本页面，支持 http_cache 中的 .html.gz 文件。
+    """
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    with open(path, 'rb') as f:
+        return f.read()
@@ -0,0 +1,95 @@
+import os
+import time
+import random
+import logging
+
+
+class ProxyMember:
+    """
+    出口池中的一个成员，url 为 None 表示直连。
+    """
+    def __init__(self, url):
+        self.url = url
+        self.name = url or 'direct'
+        self.score = 1.0          # 健康分，成功时回升，失败时减半
+        self.latency = None       # 延迟的指数移动平均
+        self.failures = 0         # 连续失败次数
+        self.ejections = 0        # 被剔除的次数，用于计算剔除时长
+        self.ejected_until = 0.0
+
+    def is_available(self, now):
+        return self.ejected_until <= now
+
+    def weight(self):
+        # 健康分越高、延迟越低的成员越容易被选中
+        return self.score / (self.latency or 1.0)
+
+
+class ProxyPool:
+    """
+    带健康评分的代理/出口池：请求分散到健康的成员上，连续失败的成员被剔除一段时间，
+    到期后重新加入观察，再次失败会被更长时间剔除。
+    """
+    def __init__(self, proxies=None, eject_after=3, eject_seconds=60, max_eject_seconds=1800, name='proxy'):
+        self.members = [ProxyMember(url) for url in (proxies or [None])]
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.name = name
+
+    @classmethod
+    def from_config(cls, path='proxies.txt', env='SCRAPER_PROXIES', **kwargs):
+        """
+        从环境变量（逗号分隔）或文件（每行一个）读取出口列表，direct 表示直连。
+        都没有配置时只使用直连。
+        """
+        entries = []
+        if os.environ.get(env):
+            entries = os.environ[env].split(',')
+        elif os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = [line for line in f if not line.startswith('#')]
+        proxies = []
+        for entry in entries:
+            entry = entry.strip()
+            if entry:
+                proxies.append(None if entry == 'direct' else entry)
+        return cls(proxies or None, **kwargs)
+
+    def choose(self):
+        """
+        在可用成员中随机取两个，选择权重较高的一个；全部被剔除时选择最早恢复的成员。
+        """
+        now = time.monotonic()
+        available = [member for member in self.members if member.is_available(now)]
+        if not available:
+            return min(self.members, key=lambda member: member.ejected_until)
+        if len(available) == 1:
+            return available[0]
+        first, second = random.sample(available, 2)
+        return first if first.weight() >= second.weight() else second
+
+    def report_success(self, member, latency):
+        member.failures = 0
+        member.score = min(1.0, member.score + 0.1)
+        if member.latency is None:
+            member.latency = latency
+        else:
+            member.latency = member.latency * 0.8 + latency * 0.2
+
+    def report_failure(self, member, reason=''):
+        member.failures += 1
+        member.score = max(0.05, member.score * 0.5)
+        if member.failures >= self.eject_after:
+            eject_seconds = min(self.max_eject_seconds, self.eject_seconds * 2 ** member.ejections)
+            member.ejections += 1
+            member.ejected_until = time.monotonic() + eject_seconds
+            # 恢复后先观察：再失败一次就重新剔除
+            member.failures = self.eject_after - 1
+            logging.warning(f"[{self.name}] 出口 {member.name} 连续失败（{reason}），剔除 {eject_seconds} 秒。")
+
+    def stats(self):
+        return ', '.join(
+            f"{member.name}: 健康分 {member.score:.2f}, 延迟 {member.latency or 0:.2f}s"
+            for member in self.members
+        )
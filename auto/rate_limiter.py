@@ -0,0 +1,76 @@
+import time
+import asyncio
+import logging
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value):
+    """
+    解析 Retry-After 响应头，支持秒数和HTTP日期两种格式，返回需要等待的秒数。
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    AIMD 自适应限速器：请求正常且延迟低于目标时线性提高速率，
+    遇到 429/5xx/超时时速率减半，并遵守服务器返回的 Retry-After。
+    同一批并发请求的失败只减速一次：上次减速之前发出的请求失败时不再减速。
+    """
+    def __init__(self, rate=2.0, min_rate=0.2, max_rate=20.0, increase=0.1, decrease=0.5,
+                 latency_target=3.0, name='ddys'):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.name = name
+        self._next_time = 0.0
+        self._last_decrease = float('-inf')
+        self._logged_rate = rate
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        wait = self._next_time - now
+        self._next_time = max(now, self._next_time) + 1.0 / self.rate
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self, latency):
+        """
+        请求成功：延迟正常时每个请求增加 increase/rate，约等于每秒增加 increase。
+        """
+        if latency <= self.latency_target:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+            self._log_rate()
+
+    def on_backoff(self, retry_after=None, sent_at=None):
+        """
+        请求被限流或失败：速率乘以 decrease；有 Retry-After 时在此之前不再发出请求。
+        sent_at 为请求发出时的 loop.time()，早于上次减速的请求已按减速前的速率发出，不再重复减速。
+        """
+        loop = asyncio.get_running_loop()
+        if sent_at is None or sent_at >= self._last_decrease:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._last_decrease = loop.time()
+            self._log_rate(force=True)
+        if retry_after:
+            self._next_time = max(self._next_time, loop.time() + retry_after)
+            logging.warning(f"[{self.name}] 服务器要求等待 {retry_after:.1f} 秒后重试。")
+
+    def _log_rate(self, force=False):
+        # 速率变化超过10%时记录日志，避免每个请求都输出
+        if force or abs(self.rate - self._logged_rate) >= self._logged_rate * 0.1:
+            logging.info(f"[{self.name}] 当前请求速率: {self.rate:.2f} 次/秒")
+            self._logged_rate = self.rate
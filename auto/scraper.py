@@ -1,10 +1,20 @@
-import requests
-from bs4 import BeautifulSoup
-import re
-import time
+import aiohttp
+import asyncio
+import argparse
+import os
+import sys
+import glob
+import multiprocessing
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
+from parsers import ParsePool
+from seen_index import SeenIndex
+from http_cache import HttpCache
+from crawl_journal import CrawlJournal
+from rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from proxy_pool import ProxyPool
+from sites import get_sites
+from catalog import CATALOG_FILE, CatalogWriter, movie_record, failed_record, read_catalog, iter_movies
+from tenacity import retry, stop_after_attempt, wait_random_exponential, retry_if_exception
 
 # 设置日志
 logging.basicConfig(
@@ -14,212 +24,477 @@ logging.basicConfig(
     encoding='utf-8'
 )
 
-# 定义请求头以模拟真实浏览器，避免403错误
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) ' 
-                  'AppleWebKit/537.36 (KHTML, like Gecko) '
-                  'Chrome/114.0.0.0 Safari/537.36',
-    'Accept-Language': 'zh-CN,zh;q=0.9',
-    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-    'Referer': 'https://ddys.pro/',
-    'Connection': 'keep-alive'
-}
-
-# 定义重试策略：最多重试3次，每次等待5秒，针对特定异常进行重试
+# 并发设置：全局连接数上限和单个站点的连接数上限，所有请求共用一个连接池
+CONCURRENCY = 10
+PER_HOST_CONCURRENCY = 5
+REQUEST_TIMEOUT = 30
+
+# 请求速率：每个站点的列表页和详情页共用一个限速器，初始速率由站点适配器决定
+# 速率在 MIN_RATE 和 MAX_RATE 之间根据服务器状态自动调整
+MIN_RATE = 0.2
+MAX_RATE = 20.0
+
+# 默认爬取的站点，多个站点用逗号分隔，见 sites.SITES
+DEFAULT_SITES = 'ddys'
+
+# 已爬取影片页面的索引文件，增量爬取时跳过已知页面
+SEEN_INDEX_FILE = 'seen_urls.json'
+
+# 页面响应缓存目录，用于 ETag/Last-Modified 重新验证和离线回放
+HTTP_CACHE_DIR = 'http_cache'
+
+# 代理/出口列表文件，每行一个代理地址，direct 表示直连；也可用环境变量 SCRAPER_PROXIES 配置
+PROXY_FILE = 'proxies.txt'
+
+# 检查点日志文件，--resume 时从这里继续上次中断的爬取
+JOURNAL_FILE = 'crawl_journal.jsonl'
+
+# 分片爬取时每个分片的结果目录，多台机器共享该目录后再合并
+SHARD_DIR = 'shards'
+
+# 解析进程数，0 表示在事件循环所在进程内解析
+PARSE_WORKERS = os.cpu_count() or 1
+
+def is_retryable(exc):
+    """
+    超时、连接错误、403、429 和 5xx 才重试，404 等错误重试也没有意义。
+    403 通常是当前出口被屏蔽，重试时会换一个出口。
+    """
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status in (403, 429) or exc.status >= 500
+    return isinstance(exc, (asyncio.TimeoutError, aiohttp.ClientError))
+
+# 定义重试策略：最多重试3次，随机指数退避，针对可重试的异常进行重试
+# 被装饰的是协程，tenacity 使用 asyncio.sleep 等待，重试期间不会阻塞其他请求
 retry_strategy = (
     retry(
         stop=stop_after_attempt(3),
-        wait=wait_fixed(5),
-        retry=retry_if_exception_type((requests.Timeout, requests.HTTPError))
+        wait=wait_random_exponential(multiplier=2, max=60),
+        retry=retry_if_exception(is_retryable),
+        reraise=True
     )
 )
 
+class CrawlContext:
+    """
+    一个站点的爬取上下文：站点适配器、该站点的限速器和出口池，
+    以及所有站点共用的连接池会话、响应缓存、解析进程池、已爬取索引、检查点日志和影片目录写入器。
+    """
+    def __init__(self, session, site, limiter=None, cache=None, parse_pool=None, index=None, journal=None,
+                 full=False, proxies=None, catalog=None):
+        self.session = session
+        self.site = site
+        self.proxies = proxies or ProxyPool(name=site.name)
+        self.limiter = limiter or AdaptiveRateLimiter(site.rate, MIN_RATE, MAX_RATE, name=site.name)
+        self.cache = cache
+        self.parse_pool = parse_pool or ParsePool(0)
+        self.index = index
+        self.journal = journal
+        self.full = full
+        self.catalog = catalog
+
 @retry_strategy
-def get_movie_links(page_url, session):
+async def fetch_html(url, ctx):
+    """
+    获取页面原始字节，返回 (html, not_modified)，状态码不是200或304时引发 ClientResponseError。
+    有缓存时发送条件请求，304 时返回缓存的页面内容；离线模式下只读缓存。
+    """
+    cache = ctx.cache
+    if cache and cache.offline:
+        return cache.load_body(url), False
+    limiter = ctx.limiter
+    await limiter.acquire()
+    headers = ctx.site.headers()
+    if cache:
+        headers.update(cache.conditional_headers(url))
+    proxy = ctx.proxies.choose()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        async with ctx.session.get(url, headers=headers, proxy=proxy.url) as response:
+            if response.status == 429 or response.status >= 500:
+                limiter.on_backoff(parse_retry_after(response.headers.get('Retry-After')), start)
+            if response.status in (403, 407, 429) or response.status >= 500:
+                ctx.proxies.report_failure(proxy, f"HTTP {response.status}")
+            elif response.status == 304 and cache:
+                limiter.on_success(loop.time() - start)
+                ctx.proxies.report_success(proxy, loop.time() - start)
+                return cache.load_body(url), True
+            response.raise_for_status()
+            html = await response.read()
+    except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as e:
+        limiter.on_backoff(sent_at=start)
+        ctx.proxies.report_failure(proxy, type(e).__name__)
+        raise
+    limiter.on_success(loop.time() - start)
+    ctx.proxies.report_success(proxy, loop.time() - start)
+    if cache:
+        cache.store(url, response.headers, html)
+    return html, False
+
+async def get_movie_links(page_url, ctx):
     """
     从影片展示页面获取所有影片的实际链接。
     """
     try:
-        response = session.get(page_url, headers=HEADERS, timeout=30)
-        response.raise_for_status()  # 如果响应状态码不是200，将引发HTTPError
-        soup = BeautifulSoup(response.text, 'html.parser')
-        movie_links = []
-        for container in soup.find_all('div', class_='post-box-container'):
-            title_tag = container.find('h2', class_='post-box-title').find('a')
-            if title_tag and 'href' in title_tag.attrs:
-                movie_link = title_tag['href']
-                movie_links.append(movie_link)
-        logging.info(f"在页面 {page_url} 找到 {len(movie_links)} 个影片链接。")
-        return movie_links
-    except requests.Timeout:
+        html, _ = await fetch_html(page_url, ctx)
+    except asyncio.TimeoutError:
         logging.error(f"请求超时：无法访问页面 {page_url}")
         raise
-    except requests.HTTPError as http_err:
+    except aiohttp.ClientError as http_err:
         logging.error(f"HTTP错误：无法访问页面 {page_url} - {http_err}")
         raise
+    try:
+        movie_links = await ctx.parse_pool.run(ctx.site.listing_parser, html)
+        logging.info(f"在页面 {page_url} 找到 {len(movie_links)} 个影片链接。")
+        return movie_links
     except Exception as e:
         logging.error(f"解析页面 {page_url} 时发生错误：{e}")
         return []
 
-@retry_strategy
-def extract_pan_links(movie_url, session):
+async def parse_movie_page(html, movie_url, ctx):
+    """
+    在解析进程池中解析影片页面，返回 (title, pan_links, douban_link, failed_url)。
+    """
+    parsed = await ctx.parse_pool.run(ctx.site.movie_parser, html)
+    # 站点解析函数没有找到影片标题时返回 None
+    if parsed is None:
+        logging.error(f"页面 {movie_url} 缺少影片标题，可能是无效页面。")
+        return None, None, None, movie_url  # 标记为失败
+    title, pan_links, douban_link = parsed
+    return title or "未知标题", pan_links, douban_link, None  # 正常返回，无错误
+
+async def extract_pan_links(movie_url, ctx):
     """
     从实际影片页面提取影片标题、网盘链接和豆瓣链接。
+    页面未修改（304）时直接使用缓存的解析结果。
     """
     try:
-        response = session.get(movie_url, headers=HEADERS, timeout=30)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 检查页面是否为有效的影片页面，通过查找h1.post-title
-        title_tag = soup.find('h1', class_='post-title')
-        if not title_tag:
-            logging.error(f"页面 {movie_url} 缺少影片标题，可能是无效页面。")
-            return None, None, None, movie_url  # 标记为失败
-        
-        # 提取影片标题
-        title = title_tag.text.strip() if title_tag else "未知标题"
-        
-        # 初始化网盘链接
-        pan_links = {}
-        
-        # 使用更全面的搜索，遍历所有文本节点以查找网盘链接
-        all_text = soup.get_text(separator='\n')
-        
-        # 定义网盘类型及其对应的正则表达式
-        pan_patterns = {
-            '夸克': r'https://pan\.quark\.cn/s/\w+',
-            '百度': r'https://pan\.baidu\.com/s/[\w\-]+\?pwd=[\w\d]+',
-            'uc': r'https://drive\.uc\.cn/s/\w+'
-        }
-        
-        # 查找所有网盘链接
-        for pan_type, pattern in pan_patterns.items():
-            matches = re.findall(pattern, all_text)
-            if matches:
-                # 取第一个匹配的链接
-                pan_links[pan_type] = matches[0]
-        
-        # 提取豆瓣链接
-        douban_link = ""
-        mod_div = soup.find('div', class_='mod')
-        if mod_div:
-            doulist_subj_div = mod_div.find('div', class_='v-overflowHidden doulist-subject')
-            if doulist_subj_div:
-                title_div = doulist_subj_div.find('div', class_='title')
-                a_tag = title_div.find('a', href=re.compile(r'https://movie\.douban\.com/subject/\d+')) if title_div else None
-                if a_tag and 'href' in a_tag.attrs:
-                    douban_link = a_tag['href'].strip()
-        
+        html, not_modified = await fetch_html(movie_url, ctx)
+        parsed = ctx.cache.get_parsed(movie_url) if not_modified else None
+        if parsed:
+            logging.info(f"影片页面未修改，使用缓存的解析结果：{movie_url}")
+            return tuple(parsed)
+
+        title, pan_links, douban_link, failed_url = await parse_movie_page(html, movie_url, ctx)
+        if failed_url:
+            return title, pan_links, douban_link, failed_url
+        if ctx.cache:
+            ctx.cache.set_parsed(movie_url, [title, pan_links, douban_link, None])
+
         # 日志记录
         if douban_link:
             logging.info(f"已提取影片《{title}》的网盘链接和豆瓣链接。")
         else:
             logging.info(f"已提取影片《{title}》的网盘链接，没有找到豆瓣链接。")
-        
+
         return title, pan_links, douban_link, None  # 正常返回，无错误
-    except requests.Timeout:
+    except asyncio.TimeoutError:
         logging.error(f"请求超时：无法访问影片页面 {movie_url}")
         return None, None, None, movie_url  # 标记为失败
-    except requests.HTTPError as http_err:
+    except aiohttp.ClientError as http_err:
         logging.error(f"HTTP错误：无法访问影片页面 {movie_url} - {http_err}")
         return None, None, None, movie_url  # 标记为失败
     except Exception as e:
         logging.error(f"解析影片页面 {movie_url} 时发生错误：{e}")
         return None, None, None, movie_url  # 标记为失败
 
-def process_movie(movie_url, session):
+async def process_movie(movie_url, ctx):
     """
     处理单个影片的爬取任务。
     """
-    return extract_pan_links(movie_url, session)
-
-def main():
-    base_url = "https://ddys.pro/page/{}/"
-    start_page = 1
-    max_pages = 1  # 设置要爬取的最大页面数
-    all_movies = []
-    no_pan_movies = []
-    failed_pages = []
-    
-    # 使用Session保持连接，提高效率
-    with requests.Session() as session:
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            for page in range(start_page, start_page + max_pages):
-                page_url = base_url.format(page)
-                try:
-                    movie_links = get_movie_links(page_url, session)
-                except Exception as e:
-                    logging.error(f"页面 {page_url} 经过重试仍无法访问，跳过此页面。")
-                    continue  # 跳过此页面
-                
-                if not movie_links:
-                    logging.info(f"页面 {page_url} 没有找到任何影片链接，继续下一个页面。")
-                    continue  # 继续下一个页面
-                
-                # 提交所有影片爬取任务
-                futures = {executor.submit(process_movie, link, session): link for link in movie_links}
-                for future in as_completed(futures):
-                    try:
-                        result = future.result()
-                        if result:
-                            title, pan_links, douban_link, failed_url = result
-                            if failed_url:
-                                failed_pages.append(failed_url)
-                            elif title:
-                                all_movies.append((title, pan_links, douban_link))
-                                if not pan_links:
-                                    no_pan_movies.append(title)
-                    except Exception as e:
-                        movie_url = futures[future]
-                        logging.error(f"处理影片 {movie_url} 时发生异常：{e}")
-                        failed_pages.append(movie_url)
-                
-                logging.info(f"已完成页面 {page} 的爬取，等待10秒后继续。")
-                time.sleep(10)  # 每个页面间隔10秒
-    
-    # 生成报告
-    try:
-        with open('report.log', 'w', encoding='utf-8') as f:
-            # 写入无法访问的影片页面列表
-            if failed_pages:
-                f.write("无法访问的影片页面列表（404或其他错误）:\n")
-                for failed_page in failed_pages:
-                    f.write(f"- {failed_page}\n")
-                f.write("\n")
+    return await extract_pan_links(movie_url, ctx)
+
+def create_session(concurrency=CONCURRENCY, per_host=PER_HOST_CONCURRENCY):
+    """
+    创建共享连接池的会话，connector 同时限制全局和单个站点的并发连接数。
+    """
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+def write_result(catalog, movie_url, result):
+    """
+    把一个影片页的提取结果写入影片目录，结果不在内存中累积。
+    """
+    title, pan_links, douban_link, failed_url = result
+    if failed_url:
+        catalog.write(failed_record(failed_url))
+    elif title:
+        catalog.write(movie_record(movie_url, title, pan_links, douban_link))
+
+async def produce_movie_links(ctx, queue, pages):
+    """
+    生产者：逐页获取影片链接并放入队列，队列满时等待详情页消费。
+    已知的影片直接使用索引中的结果；整页都已知时停止翻页，除非指定 full。
+    """
+    journal = ctx.journal
+    for page in pages:
+        page_url = ctx.site.page_url(page)
+        if page_url in journal.pages:
+            movie_links = journal.pages[page_url]
+            logging.info(f"页面 {page_url} 已在检查点中，不再重新获取。")
+        else:
+            try:
+                movie_links = await get_movie_links(page_url, ctx)
+            except Exception as e:
+                logging.error(f"页面 {page_url} 经过重试仍无法访问，跳过此页面。")
+                continue  # 跳过此页面
+
+            if not movie_links:
+                logging.info(f"页面 {page_url} 没有找到任何影片链接，继续下一个页面。")
+                continue  # 继续下一个页面
+            journal.add_page(page_url, movie_links)
+
+        known_count = 0
+        queued_count = 0
+        for link in movie_links:
+            if link in journal.movies:
+                # 上次运行已完成的影片页
+                record_result(ctx, link, journal.movies[link])
+            elif not ctx.full and ctx.index.is_known(link):
+                write_result(ctx.catalog, link, ctx.index.get(link))
+                known_count += 1
             else:
-                f.write("没有无法访问的影片页面。\n\n")
-            
-            # 写入总影片数量
-            f.write(f"总影片数量: {len(all_movies)}\n")
-            # 写入没有包含网盘信息的影片数量
-            f.write(f"没有包含网盘信息的影片数量: {len(no_pan_movies)}\n\n")
-            # 写入没有包含网盘信息的影片列表
-            if no_pan_movies:
-                f.write("没有包含网盘信息的影片列表:\n")
-                for movie in no_pan_movies:
-                    f.write(f"- {movie}\n")
-                f.write("\n")
-            
-            # 写入每个影片的名称、网盘链接和豆瓣链接
-            f.write("影片名称及其对应的网盘链接和豆瓣链接:\n")
-            for title, links, douban_link in all_movies:
-                f.write(f"影片名称: {title}\n")
-                if links:
-                    for pan, link in links.items():
-                        f.write(f"  {pan}网盘链接: {link}\n")
-                else:
-                    f.write("  无网盘链接\n")
-                
-                if douban_link:
-                    f.write(f"  豆瓣链接: {douban_link}\n")
-                else:
-                    f.write("  无豆瓣链接\n")
-                
-                f.write("\n")
-        logging.info("报告已生成至 report.log。")
+                await queue.put(link)
+                queued_count += 1
+        logging.info(f"页面 {page_url} 共 {len(movie_links)} 个影片，其中 {queued_count} 个加入队列。")
+
+        if known_count == len(movie_links):
+            logging.info(f"页面 {page_url} 的影片均已爬取过，停止翻页。")
+            break
+
+def carry_over_catalog(catalog, index, previous_path):
+    """
+    影片目录包含已爬取索引中的所有影片：本次没有写入的影片（提前停止翻页、页码范围以外或其他分片的页面）
+    用索引中的源数据补齐，只沿用原目录中这些影片的自有分享链接（share_links），返回补齐的记录数。
+    """
+    share_links = {}
+    if os.path.exists(previous_path):
+        for record in iter_movies(previous_path):
+            if record.get('share_links') and record['source_url'] not in catalog.urls:
+                share_links[record['source_url']] = record['share_links']
+    count = 0
+    for url in index.entries:
+        if url in catalog.urls:
+            continue
+        title, pan_links, douban_link, _ = index.get(url)
+        record = movie_record(url, title, pan_links, douban_link)
+        if url in share_links:
+            record['share_links'] = share_links[url]
+        catalog.write(record)
+        count += 1
+    return count
+
+def record_result(ctx, movie_url, result):
+    """
+    记录一个影片页的提取结果：写入检查点日志、更新已爬取索引并写入影片目录。
+    """
+    title, pan_links, douban_link, failed_url = result
+    if title and not failed_url:
+        if movie_url not in ctx.journal.movies:
+            ctx.journal.add_movie(movie_url, result)
+        known = ctx.index.is_known(movie_url)
+        if ctx.index.update(movie_url, title, pan_links, douban_link) and known:
+            logging.info(f"影片《{title}》的页面内容有变化：{movie_url}")
+    write_result(ctx.catalog, movie_url, result)
+
+async def consume_movie_links(ctx, queue):
+    """
+    消费者：从队列中取出影片链接并提取网盘链接，遇到 None 时退出。
+    """
+    while True:
+        movie_url = await queue.get()
+        if movie_url is None:
+            break
+        try:
+            result = await process_movie(movie_url, ctx)
+        except Exception as e:
+            logging.error(f"处理影片 {movie_url} 时发生异常：{e}")
+            result = (None, None, None, movie_url)
+        record_result(ctx, movie_url, result)
+
+async def crawl_site(ctx, pages):
+    """
+    爬取一个站点：列表页和详情页流水线执行，第N页的详情页与第N+1页的列表页同时抓取。
+    每个站点有自己的队列和 site.concurrency 个消费者，结果写入共用的影片目录。
+    """
+    queue = asyncio.Queue(maxsize=ctx.site.concurrency * 2)
+    consumers = [
+        asyncio.create_task(consume_movie_links(ctx, queue))
+        for _ in range(ctx.site.concurrency)
+    ]
+    try:
+        await produce_movie_links(ctx, queue, pages)
+    finally:
+        for _ in consumers:
+            await queue.put(None)
+        await asyncio.gather(*consumers)
+        logging.info(f"[{ctx.site.name}] 爬取结束，最终请求速率: {ctx.limiter.rate:.2f} 次/秒")
+        logging.info(f"[{ctx.site.name}] 出口状态: {ctx.proxies.stats()}")
+
+def shard_pages(start_page, max_pages, shard=None):
+    """
+    返回本分片负责的页码，shard 为 (index, count)，按页码取模分配，各分片互不重叠。
+    """
+    pages = range(start_page, start_page + max_pages)
+    if shard is None:
+        return list(pages)
+    shard_index, shard_count = shard
+    return [page for page in pages if (page - start_page) % shard_count == shard_index]
+
+def shard_file(shard):
+    shard_index, shard_count = shard
+    return os.path.join(SHARD_DIR, f"part-{shard_index}-of-{shard_count}.jsonl")
+
+def merge_shards(shard_count, catalog_file=CATALOG_FILE):
+    """
+    合并 shard_count 个分片的影片目录，按影片链接去重（成功的结果优先）后写入目录并更新已爬取索引。
+    只合并 part-<序号>-of-<shard_count>.jsonl，有分片缺失时不合并，保留原来的目录和索引，返回 False。
+    """
+    paths = [shard_file((shard_index, shard_count)) for shard_index in range(shard_count)]
+    missing = [path for path in paths if not os.path.exists(path)]
+    if missing:
+        logging.error(f"缺少 {len(missing)} 个分片的结果，不合并：{', '.join(missing)}")
+        return False
+    merged = {}
+    for path in paths:
+        for record in read_catalog(path):
+            url = record['source_url']
+            if url not in merged or merged[url]['type'] != 'movie':
+                merged[url] = record
+
+    index = SeenIndex(SEEN_INDEX_FILE)
+    for url, record in merged.items():
+        if record['type'] == 'movie':
+            index.update(url, record['title'], record['pan_links'], record['douban_link'])
+    index.save()
+
+    with CatalogWriter(catalog_file) as writer:
+        for record in merged.values():
+            writer.write(record)
+        kept = carry_over_catalog(writer, index, catalog_file)
+    logging.info(
+        f"已合并 {len(paths)} 个分片，共 {len(merged)} 个影片页，另有 {kept} 个影片使用已爬取索引中的记录，"
+        f"影片目录已写入 {catalog_file}。"
+    )
+    return True
+
+async def main(start_page=1, max_pages=1, concurrency=CONCURRENCY, per_host=PER_HOST_CONCURRENCY,
+               rate=None, full=False, offline=False, parse_workers=PARSE_WORKERS,
+               resume=False, shard=None, sites=DEFAULT_SITES):
+    # 分片时每个分片使用自己的检查点日志
+    journal_file = JOURNAL_FILE if shard is None else f"{JOURNAL_FILE}.shard-{shard[0]}-of-{shard[1]}"
+    index = SeenIndex(SEEN_INDEX_FILE)
+    journal = CrawlJournal(journal_file, resume=resume)
+    cache = HttpCache(HTTP_CACHE_DIR, offline=offline)
+    pages = shard_pages(start_page, max_pages, shard)
+    site_list = get_sites(sites, rate=rate)
+    # 结果边爬边写入 catalog.jsonl.partial，爬取完整结束后才替换原来的目录，分片时写本分片的结果
+    catalog_file = CATALOG_FILE if shard is None else shard_file(shard)
+    catalog = CatalogWriter(catalog_file, live=True)
+    # 所有站点共用一个连接池、响应缓存和解析进程池，每个站点有自己的限速器、出口池和并发数
+    with ParsePool(parse_workers) as parse_pool:
+        async with create_session(concurrency, per_host) as session:
+            contexts = [
+                CrawlContext(
+                    session,
+                    site,
+                    cache=cache,
+                    parse_pool=parse_pool,
+                    index=index,
+                    journal=journal,
+                    full=full,
+                    proxies=ProxyPool.from_config(PROXY_FILE, name=site.name),
+                    catalog=catalog
+                )
+                for site in site_list
+            ]
+            try:
+                await asyncio.gather(*(crawl_site(ctx, pages) for ctx in contexts))
+            except BaseException:
+                catalog.abort()
+                raise
+            finally:
+                # 分片之间共享索引文件，由合并步骤统一更新
+                if shard is None:
+                    index.save()
+
+    try:
+        # 分片的结果在合并时补齐
+        if shard is None:
+            kept = carry_over_catalog(catalog, index, catalog_file)
+            logging.info(f"本次没有重新获取的 {kept} 个影片使用已爬取索引中的记录。")
+        catalog.close()
+        logging.info(f"影片目录已写入 {catalog_file}，共 {catalog.count} 条记录。")
+        journal.close(finished=True)
     except Exception as e:
-        logging.error(f"生成报告时发生错误：{e}")
+        logging.error(f"写入影片目录时发生错误：{e}")
+        journal.close()
+
+def run_shard(kwargs):
+    asyncio.run(main(**kwargs))
+
+def run_workers(workers, **kwargs):
+    """
+    在本机启动 workers 个进程分别爬取一个分片，全部成功结束后合并结果，返回是否合并。
+    有分片进程异常退出时不合并，保留原来的目录和索引。每个进程自己解析页面，不再额外创建解析进程池。
+    """
+    # 清除上次的分片结果（包括名称索引），合并时只会用到本次的分片
+    for path in glob.glob(os.path.join(SHARD_DIR, 'part-*')):
+        os.remove(path)
+    processes = []
+    for shard_index in range(workers):
+        shard_kwargs = dict(kwargs, shard=(shard_index, workers), parse_workers=0)
+        process = multiprocessing.Process(target=run_shard, args=(shard_kwargs,))
+        process.start()
+        processes.append(process)
+    failed = 0
+    for process in processes:
+        process.join()
+        if process.exitcode != 0:
+            failed += 1
+            logging.error(f"分片进程 {process.name} 异常退出，退出码 {process.exitcode}。")
+    if failed:
+        logging.error(f"{failed} 个分片爬取失败，不合并分片结果，影片目录保持不变。")
+        return False
+    return merge_shards(workers)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='爬取影视站点的影片网盘链接')
+    parser.add_argument('--sites', default=DEFAULT_SITES, help='要爬取的站点，多个站点用逗号分隔')
+    parser.add_argument('--start-page', type=int, default=1, help='起始页码')
+    parser.add_argument('--max-pages', type=int, default=1, help='要爬取的最大页面数')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help='全局并发连接数')
+    parser.add_argument('--per-host', type=int, default=PER_HOST_CONCURRENCY, help='单个站点并发连接数')
+    parser.add_argument('--rate', type=float, help='每个站点的初始每秒请求数，默认使用站点的设置，运行中自动调整')
+    parser.add_argument('--full', action='store_true', help='忽略已爬取索引，重新爬取所有页面')
+    parser.add_argument('--offline', action='store_true', help='离线回放：只使用缓存的页面，不访问网络')
+    parser.add_argument('--resume', action='store_true', help='从检查点日志继续上次中断的爬取')
+    parser.add_argument('--parse-workers', type=int, default=PARSE_WORKERS, help='解析进程数，0 表示不使用进程池')
+    parser.add_argument('--shard', help='只爬取指定分片，格式 序号/分片数，例如 0/4，结果写入 shards 目录')
+    parser.add_argument('--workers', type=int, default=0, help='在本机启动多个进程分片爬取并自动合并')
+    parser.add_argument('--merge', type=int, metavar='分片数', help='合并 shards 目录中指定分片数的分片结果生成影片目录，有分片缺失时不合并')
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    kwargs = dict(
+        start_page=args.start_page,
+        max_pages=args.max_pages,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        rate=args.rate,
+        full=args.full,
+        offline=args.offline,
+        parse_workers=args.parse_workers,
+        resume=args.resume,
+        sites=args.sites,
+    )
+    if args.merge:
+        sys.exit(0 if merge_shards(args.merge) else 1)
+    elif args.workers > 1:
+        sys.exit(0 if run_workers(args.workers, **kwargs) else 1)
+    else:
+        shard = tuple(int(n) for n in args.shard.split('/')) if args.shard else None
+        asyncio.run(main(shard=shard, **kwargs))
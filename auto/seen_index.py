@@ -0,0 +1,71 @@
+import os
+import json
+import time
+import hashlib
+import logging
+
+
+def fingerprint(title, pan_links, douban_link):
+    """
+    计算影片提取结果的指纹，用于判断页面内容是否变化。
+    """
+    data = json.dumps([title, pan_links or {}, douban_link or ""], ensure_ascii=False, sort_keys=True)
+    return hashlib.md5(data.encode('utf-8')).hexdigest()
+
+
+class SeenIndex:
+    """
+    已爬取影片页面的持久化索引，记录每个URL的提取结果和指纹。
+    """
+    def __init__(self, path='seen_urls.json'):
+        self.path = path
+        self.entries = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            logging.error(f"读取已爬取索引 {self.path} 失败：{e}")
+            self.entries = {}
+
+    def is_known(self, url):
+        return url in self.entries
+
+    def get(self, url):
+        """
+        返回已记录的 (title, pan_links, douban_link, None)，与 extract_pan_links 的返回格式一致。
+        """
+        entry = self.entries[url]
+        return entry['title'], entry['pan_links'], entry['douban_link'], None
+
+    def update(self, url, title, pan_links, douban_link):
+        """
+        更新索引，返回内容是否发生变化（新页面也视为变化）。
+        """
+        fp = fingerprint(title, pan_links, douban_link)
+        entry = self.entries.get(url)
+        if entry and entry.get('fingerprint') == fp:
+            return False
+        self.entries[url] = {
+            'title': title,
+            'pan_links': pan_links or {},
+            'douban_link': douban_link or "",
+            'fingerprint': fp,
+            'updated_at': int(time.time())
+        }
+        self.dirty = True
+        return True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
@@ -0,0 +1,71 @@
+import parsers
+
+# 浏览器通用请求头，各站点在此基础上补充 Referer 等
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                  'AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/114.0.0.0 Safari/537.36',
+    'Accept-Language': 'zh-CN,zh;q=0.9',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Connection': 'keep-alive'
+}
+
+
+class SiteAdapter:
+    """
+    影片来源站点适配器：列表页地址规则、影片链接提取和影片页解析。
+    listing_parser 和 movie_parser 必须是模块级函数，才能交给解析进程池执行：
+    listing_parser(html) 返回影片链接列表，movie_parser(html) 返回
+    (title, pan_links, douban_link)，不是有效影片页时返回 None。
+    每个站点有自己的并发数和请求速率。
+    """
+    name = ''
+    listing_url = ''
+    referer = ''
+    listing_parser = None
+    movie_parser = None
+    concurrency = 5
+    rate = 2.0
+
+    def __init__(self, concurrency=None, rate=None):
+        if concurrency:
+            self.concurrency = concurrency
+        if rate:
+            self.rate = rate
+
+    def page_url(self, page):
+        return self.listing_url.format(page)
+
+    def headers(self):
+        return dict(BROWSER_HEADERS, Referer=self.referer)
+
+
+class DdysSite(SiteAdapter):
+    """
+    低端影视 ddys.pro。
+    """
+    name = 'ddys'
+    listing_url = 'https://ddys.pro/page/{}/'
+    referer = 'https://ddys.pro/'
+    listing_parser = staticmethod(parsers.parse_listing)
+    movie_parser = staticmethod(parsers.parse_movie)
+    concurrency = 10
+
+
+# 已注册的站点，新增站点时在这里添加
+SITES = {
+    DdysSite.name: DdysSite,
+}
+
+
+def get_sites(names, concurrency=None, rate=None):
+    """
+    按名称创建站点适配器，names 为逗号分隔的站点名。
+    """
+    sites = []
+    for name in names.split(','):
+        name = name.strip()
+        if name not in SITES:
+            raise ValueError(f"未知站点: {name}，可用站点: {', '.join(SITES)}")
+        sites.append(SITES[name](concurrency, rate))
+    return sites
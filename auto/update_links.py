@@ -1,35 +1,66 @@
-import re
+import time
+from catalog import CATALOG_FILE, rewrite_catalog, normalize_title, title_key, load_title_index
 
 def read_quark_links(quark_file):
+    """
+    读取分享结果，返回 {名称匹配键: (分享名称, 链接)}。
+    """
     quark_dict = {}
     with open(quark_file, 'r', encoding='utf-8') as f:
         for line in f:
             if '>>>' in line:
                 movie, link = line.strip().split('>>>')
-                quark_dict[movie] = link
+                quark_dict[normalize_title(movie)] = (movie, link)
     return quark_dict
 
-def update_report_log(report_file, quark_dict):
-    with open(report_file, 'r', encoding='utf-8') as f:
-        content = f.read()
+def share_links(shares):
+    """
+    由自动分享返回的结果 [{"name", "share_url", ...}] 生成 {名称匹配键: (分享名称, 链接)}。
+    """
+    return {normalize_title(share['name']): (share['name'], share['share_url']) for share in shares}
 
-    for movie, new_quark_link in quark_dict.items():
-        # 构建匹配模式，忽略影片名称后的括号内容
-        pattern = rf'(影片名称: {re.escape(movie)}(?:\s*\([^)]*\))?\s+夸克网盘链接: )https?://\S+'
-        # 替换新的夸克链接
-        content, count = re.subn(pattern, rf'\1{new_quark_link}', content)
-        if count == 0:
-            print(f'未找到电影 {movie} 的夸克链接，未进行更新。')
+def update_catalog(catalog_file, quark_dict):
+    """
+    一遍读取影片目录，按名称匹配键在分享结果中查找新的夸克链接，写入记录的 share_links，返回未找到的分享名称。
+    """
+    # 先用名称索引找出目录中没有的影片，一个都匹配不到时不读写目录
+    title_index = load_title_index(catalog_file)
+    if title_index:
+        missing = [movie for key, (movie, _) in quark_dict.items() if key not in title_index]
+        if len(missing) == len(quark_dict):
+            print('已替换 0 个影片的夸克链接。')
+            return missing
 
-    with open(report_file, 'w', encoding='utf-8') as f:
-        f.write(content)
+    found = set()
+
+    def update(record):
+        # 只替换原来就有夸克链接的影片
+        if record['type'] != 'movie' or '夸克' not in record['pan_links']:
+            return record
+        key = title_key(record)
+        entry = quark_dict.get(key)
+        if entry:
+            found.add(key)
+            # 自有分享链接单独保存，pan_links 保持爬取到的原始链接，生成转存任务时仍使用原始链接
+            share_links = record.setdefault('share_links', {})
+            if share_links.get('夸克') != entry[1]:
+                share_links['夸克'] = entry[1]
+                record['updated_at'] = int(time.time())
+        return record
+
+    changed = rewrite_catalog(update, catalog_file)
+    print(f'已替换 {changed} 个影片的夸克链接。')
+    return [movie for key, (movie, _) in quark_dict.items() if key not in found]
 
 def main():
+    # 自动分享（kua-main/quark_share.py）会直接替换目录中的链接，这里用于手动导入分享结果文件
     quark_file = 'quark-share-123.txt'
-    report_file = 'report.log'
     quark_dict = read_quark_links(quark_file)
-    update_report_log(report_file, quark_dict)
-    print('报告已更新。')
+    missing = update_catalog(CATALOG_FILE, quark_dict)
+    if missing:
+        print(f'以下 {len(missing)} 部电影未找到夸克链接，未进行更新：')
+        print('\n'.join(missing))
+    print('影片目录已更新。')
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -24,6 +24,7 @@ import os
 parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, parent_dir)
 from quark_auto_save import Quark
+from task_store import read_config, write_config
 
 
 def get_app_ver():
@@ -142,7 +143,8 @@ def index():
 def get_data():
     if not is_login():
         return redirect(url_for("login"))
-    data = read_json()
+    # tasklist 来自任务库，每个任务带有行 id（_id）
+    data = read_config(CONFIG_PATH, with_ids=True)
     del data["webui"]
     return jsonify(data)
 
@@ -156,7 +158,10 @@ def update():
     webui = data["webui"]
     data = request.json
     data["webui"] = webui
-    write_json(data)
+    # 页面只提交新增和修改过的任务以及删除的任务 id，按行 id 写入任务库，
+    # 其他任务（例如页面打开后 movie_list 添加的任务）保持不变；其他配置写入 JSON 文件
+    removed_taskids = data.pop("removed_taskids", [])
+    write_config(CONFIG_PATH, data, removed_taskids, indent=4)
     # 重新加载任务
     if reload_tasks():
         logging.info(f">>> 配置更新成功")
@@ -12,9 +12,14 @@ import asyncio
 import aiohttp
 import re
 import os
-from quark_auto_save import Quark
+from quark_auto_save import Quark, QuarkUnavailable
 from check_quark_links import print_bordered_table
 
+# 影片目录由 auto 目录下的爬虫生成，读写接口也在那里
+AUTO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'auto')
+sys.path.insert(0, AUTO_DIR)
+from catalog import CATALOG_FILE, iter_movies, published_links
+
 # 钉钉通知配置
 ACCESS_TOKEN = ""
 SECRET = ""
@@ -85,9 +90,8 @@ def send_dingtalk_notification(message):
 async def check_movie_links(config_file):
     try:
         # 构建正确的文件路径
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        report_path = os.path.join(base_dir, 'auto', 'report.log')
-        print(f"尝试读取文件: {report_path}")
+        catalog_path = os.path.join(AUTO_DIR, CATALOG_FILE)
+        print(f"尝试读取文件: {catalog_path}")
         
         # 加载 .gitignore 规则
         ignore_patterns = load_gitignore()
@@ -104,7 +108,7 @@ async def check_movie_links(config_file):
 
         async with aiohttp.ClientSession() as session:
             # 创建Quark对象
-            quark = Quark(cookie, 0)
+            quark = Quark(cookie, 0, config_data.get('rate_limit'))
             
             # 验证账号
             if not await quark.init(session):
@@ -113,50 +117,17 @@ async def check_movie_links(config_file):
 
             print(f"账号验证成功: {quark.nickname}")
 
-            # 读取report.log文件
+            # 逐条读取影片目录中有夸克链接的影片
             try:
-                with open(report_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                print(f"成功读取文件，内容长度: {len(content)} 字符")
+                movie_info = [
+                    {'name': movie['title'], 'url': published_links(movie)['夸克']}
+                    for movie in iter_movies(catalog_path)
+                    if published_links(movie).get('夸克')
+                ]
             except FileNotFoundError:
-                print(f"错误: 找不到文件 {report_path}", file=sys.stderr)
+                print(f"错误: 找不到文件 {catalog_path}", file=sys.stderr)
                 return 1
 
-            # 解析影片信息
-            movie_info = []
-            current_movie = None
-            start_parsing = False
-            
-            for line in content.split('\n'):
-                line = line.strip()
-                
-                # 开始标记
-                if line == "影片名称及其对应的网盘链接和豆瓣链接:":
-                    start_parsing = True
-                    continue
-                    
-                if not start_parsing:
-                    continue
-                
-                # 匹配影片名称
-                if line.startswith('影片名称:'):
-                    if current_movie and 'url' in current_movie:
-                        movie_info.append(current_movie)
-                    movie_name = line[5:].strip()
-                    current_movie = {'name': movie_name}
-                    print(f"找到影片: {movie_name}")
-                
-                # 匹配夸克网盘链接
-                elif '夸克网盘链接:' in line:
-                    if current_movie:
-                        url = line.split('夸克网盘链接:')[1].strip()
-                        current_movie['url'] = url
-                        print(f"找到链接: {url}")
-
-            # 添加最后一个影片
-            if current_movie and 'url' in current_movie:
-                movie_info.append(current_movie)
-
             print(f"\n总共找到 {len(movie_info)} 个影片信息")
             for movie in movie_info:
                 print(f"影片: {movie['name']} - {movie['url']}")
@@ -172,10 +143,17 @@ async def check_movie_links(config_file):
                 
                 print(f"正在检查: {movie_name}")
                 pwd_id, _ = quark.get_id_from_url(shareurl)
-                is_valid, stoken = await quark.get_stoken(session, pwd_id)
+                try:
+                    is_valid, stoken = await quark.get_stoken(session, pwd_id)
+                    content_check = None
+                    if is_valid:
+                        content_check = await check_directory_content(quark, session, pwd_id, stoken, ignore_patterns=ignore_patterns)
+                except QuarkUnavailable as e:
+                    # 接口暂时不可用，无法判断链接是否有效，不计入任何结果
+                    print(f"无法检查: {movie_name} - {e}")
+                    continue
 
                 if is_valid:
-                    content_check = await check_directory_content(quark, session, pwd_id, stoken, ignore_patterns=ignore_patterns)
                     if content_check is None:
                         print(f"链接无效: {movie_name} - 无法获取内容")
                         invalid_links.append((movie_name, shareurl))
@@ -1,6 +1,6 @@
-import json
 import sys
 from quark_auto_save import Quark
+from task_store import read_config
 
 def print_bordered_table(title, data, headers):
     if not data:
@@ -31,9 +31,8 @@ def print_bordered_table(title, data, headers):
     print("╚" + "═" * (total_width - 2) + "╝")
 
 def check_quark_links(config_file):
-    # 读取配置文件
-    with open(config_file, 'r', encoding='utf-8') as file:
-        config_data = json.load(file)
+    # 读取配置文件，任务列表来自任务库
+    config_data = read_config(config_file)
 
     # 获取cookie
     cookie = config_data.get('cookie', [])[0] if config_data.get('cookie') else None
@@ -42,7 +41,7 @@ def check_quark_links(config_file):
         return
 
     # 创建Quark对象
-    quark = Quark(cookie, 0)
+    quark = Quark(cookie, 0, config_data.get('rate_limit'))
 
     # 验证账号
     if not quark.init():
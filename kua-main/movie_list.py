@@ -1,42 +1,86 @@
+import sys
 import json
+import codecs
+import asyncio
+import argparse
+import aiohttp
+from quark_auto_save import Quark, get_cookies
+from task_store import open_task_store
 
-# 读取现有的JSON配置文件
-def read_json_config(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+ENCODINGS = ['utf-8', 'gbk', 'gb18030']
 
-# 写入更新后的JSON配置文件
-def write_json_config(file_path, data):
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+# 批量导入时同时校验的分享链接数
+IMPORT_CONCURRENCY = 20
 
-# 从txt文件读取影片信息
-def read_movie_info(file_path):
-    encodings = ['utf-8', 'gbk', 'gb18030']
-    movie_info = []
-    
-    for encoding in encodings:
+# 批量导入时每个事务写入的任务数
+IMPORT_BATCH_SIZE = 200
+
+# 逐块检测文件编码，不把整个文件读入内存
+def detect_encoding(file_path):
+    for encoding in ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
         try:
-            with open(file_path, 'r', encoding=encoding) as f:
-                for line in f:
-                    parts = line.strip().split('=')
-                    if len(parts) >= 3:
-                        info = {
-                            'taskname': parts[0],
-                            'shareurl': parts[1],
-                            'savepath': parts[2],
-                            'update_subdir': parts[3] if len(parts) > 3 else None
-                        }
-                        movie_info.append(info)
-            return movie_info  # 如果成功读取，直接返回结果
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(65536), b''):
+                    decoder.decode(chunk)
+                decoder.decode(b'', final=True)
+            return encoding
         except UnicodeDecodeError:
             continue  # 如果当前编码失败，尝试下一个编码
-    
+
     raise ValueError("无法使用支持的编码读取文件。请检查/root/quark/movie_list.txt 文件是否有乱码")
 
-# 更新JSON配置文件
-def update_json_config(config, new_movies):
-    for movie in new_movies:
+# 逐行读取txt文件中的影片信息
+def iter_movie_info(file_path):
+    encoding = detect_encoding(file_path)
+    with open(file_path, 'r', encoding=encoding) as f:
+        for line in f:
+            parts = line.strip().split('=')
+            if len(parts) >= 3:
+                yield {
+                    'taskname': parts[0],
+                    'shareurl': parts[1],
+                    'savepath': parts[2],
+                    'update_subdir': parts[3] if len(parts) > 3 else None
+                }
+
+# 从txt文件读取影片信息
+def read_movie_info(file_path):
+    return list(iter_movie_info(file_path))
+
+# 更新任务库，只写入新增或有变化的任务，返回这些任务的名称
+def update_task_store(store, new_movies):
+    changed = set()
+    with store.transaction():
+        for movie in new_movies:
+            if update_task(store, movie):
+                changed.add(movie['taskname'])
+    return changed
+
+def update_task(store, movie, shareurl_ban=None):
+    # 由影片信息生成任务字段，已存在的任务只比较和覆盖这些字段，
+    # emby_id、pattern 等由转存脚本或网页端维护的字段保持不变
+    fields = {
+        'shareurl': movie['shareurl'],
+        'savepath': movie['savepath']
+    }
+    if movie['update_subdir']:
+        fields['update_subdir'] = movie['update_subdir']
+    # shareurl_ban 不为 None 时记录分享链接的校验结果，空字符串表示链接有效
+    if shareurl_ban is not None:
+        fields['shareurl_ban'] = shareurl_ban
+
+    # 按任务名称查找已存在的任务，同名任务以第一个为准
+    existing = store.find_task(movie['taskname'])
+    if existing:
+        task_id, existing_task = existing
+        # 更新现有任务，内容没有变化时不写入
+        if all(existing_task.get(key) == value for key, value in fields.items()):
+            return False
+        existing_task.update(fields)
+        store.update_task(task_id, existing_task)
+    else:
+        # 添加新任务，其他字段使用默认值
         task = {
             'taskname': movie['taskname'],
             'shareurl': movie['shareurl'],
@@ -48,37 +92,122 @@ def update_json_config(config, new_movies):
             'ignore_extension': False,
             'runweek': [1, 2, 3, 4, 5, 6, 7]
         }
-        if movie['update_subdir']:
-            task['update_subdir'] = movie['update_subdir']
-        
-        # 检查是否已存在相同的taskname
-        existing_task = next((t for t in config['tasklist'] if t['taskname'] == movie['taskname']), None)
-        if existing_task:
-            # 更新现有任务
-            existing_task.update(task)
-        else:
-            # 添加新任务
-            config['tasklist'].append(task)
+        task.update(fields)
+        store.add_task(task)
+    return True
+
+# 批量导入：逐行读取，按 pwd_id 去重，并发校验分享链接后写入任务库，失效的链接标记 shareurl_ban
+# 校验结果每 IMPORT_BATCH_SIZE 个在一个事务中写入
+async def bulk_import(store, account, file_path, concurrency=IMPORT_CONCURRENCY):
+    stats = {'total': 0, 'duplicate': 0, 'unchanged': 0, 'live': 0, 'dead': 0, 'unknown': 0}
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    pending = []
+
+    def flush():
+        with store.transaction():
+            for movie, shareurl_ban in pending:
+                update_task(store, movie, shareurl_ban)
+        pending.clear()
+
+    async def validate(session):
+        while True:
+            movie = await queue.get()
+            if movie is None:
+                break
+            try:
+                is_sharing, message = await account.get_stoken(session, movie['pwd_id'])
+            except Exception as e:
+                # 请求失败，无法判断链接是否有效，照常写入，转存时再校验
+                pending.append((movie, None))
+                stats['unknown'] += 1
+                print(f"校验分享链接出错：{movie['taskname']} - {e}")
+            else:
+                if is_sharing:
+                    pending.append((movie, ''))
+                    stats['live'] += 1
+                else:
+                    # 接口返回了错误码：分享不存在、已取消、已过期等
+                    pending.append((movie, message))
+                    stats['dead'] += 1
+                    print(f"分享链接失效：{movie['taskname']} - {message}")
+            if len(pending) >= IMPORT_BATCH_SIZE:
+                flush()
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        workers = [asyncio.create_task(validate(session)) for _ in range(concurrency)]
+        try:
+            seen = set()
+            for movie in iter_movie_info(file_path):
+                stats['total'] += 1
+                pwd_id = (account.get_id_from_url(movie['shareurl']) or (None,))[0]
+                if not pwd_id or pwd_id in seen:
+                    stats['duplicate'] += 1
+                    continue
+                seen.add(pwd_id)
+                # 分享链接没有变化的已有任务不再校验
+                existing = store.find_task(movie['taskname'])
+                if existing and existing[1].get('shareurl') == movie['shareurl']:
+                    stats['unchanged'] += 1
+                    continue
+                await queue.put(dict(movie, pwd_id=pwd_id))
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+            if pending:
+                flush()
+    return stats
+
+async def import_main(json_file_path, txt_file_path, concurrency):
+    with open(json_file_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    cookies = get_cookies(config.get('cookie'))
+    if not cookies:
+        print("错误: 配置文件中没有找到 cookie。")
+        return 1
+
+    # 校验分享链接属于读接口，实际速度同时受 --concurrency 和配置文件中 rate_limit 的 read 速率限制
+    account = Quark(cookies[0], 0, config.get('rate_limit'))
+    async with aiohttp.ClientSession() as session:
+        if not await account.init(session):
+            print("错误: 账号验证失败，请检查cookie是否有效。")
+            return 1
+
+    with open_task_store(json_file_path) as store:
+        stats = await bulk_import(store, account, txt_file_path, concurrency)
+    print(
+        f"导入完成：共 {stats['total']} 行，重复或无效 {stats['duplicate']} 个，未变化 {stats['unchanged']} 个，"
+        f"有效 {stats['live']} 个，失效 {stats['dead']} 个，未能校验 {stats['unknown']} 个。"
+    )
+    return 0
 
 # 主函数
 def main():
-    json_file_path = 'quark_config.json'
+    parser = argparse.ArgumentParser(description='把影片链接写入转存任务库')
+    parser.add_argument('--config', default='quark_config.json', help='配置文件路径')
+    parser.add_argument('--import', dest='import_file', help='批量导入：并发校验分享链接后写入任务库')
+    parser.add_argument('--concurrency', type=int, default=IMPORT_CONCURRENCY, help='批量导入时同时校验的链接数，每秒校验数不超过配置文件中 rate_limit 的 read 速率')
+    args = parser.parse_args()
+
+    if args.import_file:
+        sys.exit(asyncio.run(import_main(args.config, args.import_file, args.concurrency)))
+
+    json_file_path = args.config
     txt_file_path = 'movie_links.txt'
 
     try:
-        # 读取现有的JSON配置
-        config = read_json_config(json_file_path)
-
         # 读取txt文件中的影片信息
         new_movies = read_movie_info(txt_file_path)
 
-        # 更新JSON配置
-        update_json_config(config, new_movies)
-
-        # 写入更新后的JSON配置
-        write_json_config(json_file_path, config)
+        # 更新任务库，首次运行时从配置文件导入已有任务
+        with open_task_store(json_file_path) as store:
+            changed = update_task_store(store, new_movies)
 
-        print("配置文件已成功更新。")
+        if not changed:
+            print("没有新增或变化的任务，任务库未修改。")
+        else:
+            print(f"任务库已成功更新，{len(changed)} 个任务新增或有变化。")
     except Exception as e:
         print(f"发生错误：{str(e)}")
 
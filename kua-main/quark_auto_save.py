@@ -13,8 +13,10 @@ import random
 import asyncio
 import aiohttp
 import logging
+import contextvars
 from datetime import datetime
-from functools import lru_cache
+from urllib.parse import urlparse
+from task_store import open_task_store
 
 # 兼容青龙
 try:
@@ -26,6 +28,43 @@ except ImportError:
 CONFIG_DATA = {}
 NOTIFYS = []
 GH_PROXY = os.environ.get("GH_PROXY", "https://ghproxy.net/")
+# 自动分享时同时创建的分享数
+SHARE_CONCURRENCY = 5
+# 每个账号同时执行的转存任务数，可在配置文件中用 save_concurrency 修改
+SAVE_CONCURRENCY = 5
+# 并发执行转存任务时，每个任务的通知先写入自己的缓冲区，全部完成后按任务顺序合并到 NOTIFYS
+TASK_NOTIFYS = contextvars.ContextVar("TASK_NOTIFYS", default=None)
+# 转存过程中会修改的任务字段，运行结束时只写回这些字段
+TASK_RESULT_FIELDS = ("shareurl_ban", "emby_id")
+
+# 请求超时：连接 10 秒，读取 30 秒
+FETCH_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30)
+# 可重试的请求最多重试的次数，以及退避时间的基数和上限（秒）
+FETCH_RETRIES = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8
+# 只读取数据、可以安全重试的 POST 接口
+IDEMPOTENT_POSTS = ("/share/sharepage/token", "/file/info/path_list", "/share/password")
+# 同一域名连续失败多少次后熔断，熔断多少秒后再试探
+CIRCUIT_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30
+CIRCUIT_BREAKERS = {}
+FETCH_STATS = {"requests": 0, "retries": 0, "timeouts": 0, "failures": 0, "rejected": 0}
+# 目录或文件不存在时接口返回的错误码，只有遇到这些错误码时才认为保存目录的 fid 已失效
+FID_GONE_CODES = (41004, 41013)
+# 目录 fid 的缓存时间（秒），不存在的目录也会缓存，创建或删除目录时更新缓存
+FID_CACHE_TTL = 600
+# 每个账号的请求速率（次/秒）和突发量，读接口和写接口分开限速，可在配置文件中用 rate_limit 修改
+RATE_LIMITS = {"read": {"rate": 8, "burst": 8}, "write": {"rate": 2, "burst": 2}}
+# 写接口：转存、创建目录、重命名、删除、创建分享
+WRITE_ENDPOINTS = (
+    "/share/sharepage/save",
+    "/clouddrive/file",
+    "/file/rename",
+    "/file/delete",
+    "/file/recycle/remove",
+    "/clouddrive/share",
+)
 
 MAGIC_REGEX = {
     "$TV": {
@@ -42,14 +81,130 @@ logging.basicConfig(
     level=logging.INFO
 )
 
+class QuarkUnavailable(Exception):
+    """
+    请求夸克接口时没有得到答复（熔断、超时或重试用尽），与接口返回的错误区分开：
+    调用方应当跳过本次操作，而不是把结果当作分享失效等确定的结论保存下来。
+    """
+
+class CircuitBreaker:
+    """
+    按域名熔断：连续失败 threshold 次后打开，cooldown 秒内的请求直接失败；
+    冷却结束后放行一个试探请求，成功则恢复，失败则继续熔断。
+    """
+    def __init__(self, threshold=CIRCUIT_THRESHOLD, cooldown=CIRCUIT_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def allow(self):
+        if self.opened_at is None:
+            return True
+        if self.probing or time.monotonic() - self.opened_at < self.cooldown:
+            return False
+        self.probing = True
+        return True
+
+    def release(self):
+        # 请求被取消，结果未知：不计成功或失败，只释放试探请求的名额
+        self.probing = False
+
+    def record(self, success):
+        self.probing = False
+        if success:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+class TokenBucket:
+    """
+    令牌桶限速：每秒补充 rate 个令牌，最多积累 burst 个。
+    令牌不足时先预留再等待，等待的请求按到达顺序依次放行。
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+def endpoint_class(url):
+    return "write" if urlparse(url).path.endswith(WRITE_ENDPOINTS) else "read"
+
+def request_policy(method, url):
+    """
+    接口的请求策略，返回最多重试次数：GET 和只读的 POST 接口可以重试，
+    转存、创建目录、分享等写接口不重试，避免重复执行。
+    """
+    if method == "GET" or urlparse(url).path.endswith(IDEMPOTENT_POSTS):
+        return FETCH_RETRIES
+    return 0
+
+def fetch_summary():
+    return (
+        f"请求 {FETCH_STATS['requests']} 次，重试 {FETCH_STATS['retries']} 次，"
+        f"超时 {FETCH_STATS['timeouts']} 次，失败 {FETCH_STATS['failures']} 次，熔断 {FETCH_STATS['rejected']} 次"
+    )
+
 async def fetch(session, method, url, **kwargs):
-    try:
-        async with session.request(method, url, **kwargs) as response:
-            response.raise_for_status()
-            return await response.json()
-    except Exception as e:
-        logging.error(f"请求失败: {method} {url} - {e}")
-        return None
+    host = urlparse(url).hostname
+    breaker = CIRCUIT_BREAKERS.setdefault(host, CircuitBreaker())
+    kwargs.setdefault("timeout", FETCH_TIMEOUT)
+    # api_errors 为真时，4xx 响应中带错误码的 JSON 也返回给调用方（例如目录不存在），而不是返回 None
+    api_errors = kwargs.pop("api_errors", False)
+    retries = request_policy(method, url)
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            FETCH_STATS["rejected"] += 1
+            logging.error(f"请求失败: {method} {url} - {host} 已熔断")
+            return None
+        FETCH_STATS["requests"] += 1
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                if api_errors and 400 <= response.status < 500 and response.status != 429:
+                    result = await response.json(content_type=None)
+                else:
+                    response.raise_for_status()
+                    result = await response.json()
+            breaker.record(True)
+            return result
+        except Exception as e:
+            # 超时、连接错误、429 和 5xx 是临时故障，计入熔断并可以重试；其他错误直接返回
+            if isinstance(e, asyncio.TimeoutError):
+                FETCH_STATS["timeouts"] += 1
+                transient = True
+            elif isinstance(e, aiohttp.ClientResponseError):
+                transient = e.status == 429 or e.status >= 500
+            else:
+                transient = isinstance(e, aiohttp.ClientConnectionError)
+            breaker.record(not transient)
+            if not transient or attempt >= retries:
+                FETCH_STATS["failures"] += 1
+                logging.error(f"请求失败: {method} {url} - {e!r}")
+                return None
+        except BaseException:
+            # CancelledError 等不是 Exception，不释放的话熔断器会一直停在试探状态
+            breaker.release()
+            raise
+        # 指数退避加随机抖动，避免并发的任务同时重试
+        delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+        attempt += 1
+        FETCH_STATS["retries"] += 1
+        logging.info(f"请求重试({attempt}/{retries}): {method} {url}，{delay:.1f}s 后重试")
+        await asyncio.sleep(delay)
 
 def magic_regex_func(pattern, replace):
     keyword = pattern
@@ -71,7 +226,11 @@ async def send_ql_notify(title, body):
 
 def add_notify(text):
     global NOTIFYS
-    NOTIFYS.append(text)
+    task_notifys = TASK_NOTIFYS.get()
+    if task_notifys is not None:
+        task_notifys.append(text)
+    else:
+        NOTIFYS.append(text)
     logging.info(text)
     return text
 
@@ -90,6 +249,15 @@ def download_file_sync(url, save_path):
         logging.error(f"下载文件异常: {url} - {e}")
         return False
 
+def share_alive(share):
+    """
+    我的分享列表中的一项是否仍然可用：状态正常（status 为 1）且没有过期，expired_at 为毫秒时间戳。
+    """
+    if share.get("status", 1) != 1:
+        return False
+    expired_at = share.get("expired_at")
+    return not expired_at or expired_at > time.time() * 1000
+
 def get_cookies(cookie_val):
     if isinstance(cookie_val, list):
         return cookie_val
@@ -102,7 +270,7 @@ def get_cookies(cookie_val):
         return False
 
 class Quark:
-    def __init__(self, cookie, index=None):
+    def __init__(self, cookie, index=None, rate_limits=None):
         self.cookie = cookie.strip()
         self.index = index + 1
         self.is_active = False
@@ -110,11 +278,25 @@ class Quark:
         self.st = self.match_st_form_cookie(cookie)
         self.mparam = self.match_mparam_form_cookie(cookie)
         self.savepath_fid = {"/": "0"}
+        self.uid = self.match_uid_form_cookie(cookie)
+        # 目录路径 -> (fid 或 None, 过期时间)，以及正在查询的目录路径 -> Future
+        self.fid_cache = {}
+        self.fid_pending = {}
+        # rate_limits 来自配置文件的 rate_limit，由调用方传入，没有配置的类别使用 RATE_LIMITS
+        rate_limits = dict(RATE_LIMITS, **(rate_limits or {}))
+        self.limiters = {
+            name: TokenBucket(limit["rate"], limit.get("burst"))
+            for name, limit in rate_limits.items()
+        }
 
     def match_st_form_cookie(self, cookie):
         match = re.search(r"=(st[a-zA-Z0-9]+);", cookie)
         return match.group(1) if match else False
 
+    def match_uid_form_cookie(self, cookie):
+        match = re.search(r"(?<!\w)__uid=([^;]+)", cookie)
+        return match.group(1).strip() if match else ""
+
     def match_mparam_form_cookie(self, cookie):
         mparam = {}
         kps_match = re.search(r"(?<!\w)kps=([a-zA-Z0-9%]+)[;&]?", cookie)
@@ -128,6 +310,11 @@ class Quark:
             }
         return mparam
 
+    async def request(self, session, method, url, **kwargs):
+        # 按接口类别限速后再发出请求
+        await self.limiters[endpoint_class(url)].acquire()
+        return await fetch(session, method, url, **kwargs)
+
     def common_headers(self):
         headers = {
             "cookie": self.cookie,
@@ -150,7 +337,7 @@ class Quark:
         url = "https://pan.quark.cn/account/info"
         querystring = {"fr": "pc", "platform": "pc"}
         headers = self.common_headers()
-        response = await fetch(session, "GET", url, headers=headers, params=querystring)
+        response = await self.request(session, "GET", url, headers=headers, params=querystring)
         if response and response.get("data"):
             return response["data"]
         else:
@@ -168,7 +355,7 @@ class Quark:
         headers = {
             "content-type": "application/json",
         }
-        response = await fetch(session, "GET", url, headers=headers, params=querystring)
+        response = await self.request(session, "GET", url, headers=headers, params=querystring)
         if response and response.get("data"):
             return response["data"]
         else:
@@ -189,7 +376,7 @@ class Quark:
         headers = {
             "content-type": "application/json",
         }
-        response = await fetch(session, "POST", url, json=payload, headers=headers, params=querystring)
+        response = await self.request(session, "POST", url, json=payload, headers=headers, params=querystring)
         if response and response.get("data"):
             return True, response["data"]["sign_daily_reward"]
         elif response:
@@ -216,13 +403,14 @@ class Quark:
         querystring = {"pr": "ucpro", "fr": "h5"}
         payload = {"pwd_id": pwd_id, "passcode": ""}
         headers = self.common_headers()
-        response = await fetch(session, "POST", url, json=payload, headers=headers, params=querystring)
-        if response and response.get("data"):
+        # 分享不存在、已取消等错误可能以 4xx 响应返回，带错误码的都是接口给出的结论
+        response = await self.request(session, "POST", url, json=payload, headers=headers, params=querystring, api_errors=True)
+        if response and response.get("code") == 0 and response.get("data"):
             return True, response["data"]["stoken"]
-        elif response:
-            return False, response["message"]
+        elif response and response.get("code"):
+            return False, response.get("message") or f"错误码 {response['code']}"
         else:
-            return False, "未知错误"
+            raise QuarkUnavailable("获取stoken失败：无响应")
 
     async def get_detail(self, session, pwd_id, stoken, pdir_fid):
         file_list = []
@@ -244,8 +432,11 @@ class Quark:
                 "_sort": "file_type:asc,updated_at:desc",
             }
             headers = self.common_headers()
-            response = await fetch(session, "GET", url, headers=headers, params=querystring)
-            if response and response["data"]["list"]:
+            response = await self.request(session, "GET", url, headers=headers, params=querystring)
+            if not response:
+                # 只拿到部分列表时不能当作完整结果使用
+                raise QuarkUnavailable("获取分享文件列表失败：无响应")
+            if response["data"]["list"]:
                 file_list += response["data"]["list"]
                 page += 1
             else:
@@ -254,25 +445,91 @@ class Quark:
                 break
         return file_list
 
-    @lru_cache(maxsize=128)
     async def get_fids(self, session, file_paths):
-        fids = []
-        while file_paths:
-            batch = file_paths[:50]
-            file_paths = file_paths[50:]
+        """
+        查询目录的 fid，返回 [{"file_path", "fid"}]，不存在的目录不在结果中。
+        结果缓存 FID_CACHE_TTL 秒；并发查询同一个目录时只发出一次请求，
+        未命中缓存的目录每 50 个合并为一次 path_list 请求。
+        """
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        file_paths = list(dict.fromkeys(file_paths))
+        hits = {}
+        waiting = {}
+        misses = []
+        for file_path in file_paths:
+            cached = self.fid_cache.get(file_path)
+            if cached and cached[1] > now:
+                hits[file_path] = cached[0]
+                continue
+            if file_path not in self.fid_pending:
+                self.fid_pending[file_path] = loop.create_future()
+                misses.append(file_path)
+            waiting[file_path] = self.fid_pending[file_path]
+        if misses:
+            await asyncio.gather(
+                *[self.query_fids(session, misses[i:i + 50]) for i in range(0, len(misses), 50)]
+            )
+        for file_path, future in waiting.items():
+            # 其他协程也在等待同一个 Future，取消当前协程时不能取消它
+            hits[file_path] = await asyncio.shield(future)
+        return [
+            {"file_path": file_path, "fid": hits[file_path]}
+            for file_path in file_paths
+            if hits[file_path]
+        ]
+
+    async def query_fids(self, session, batch):
+        found = {}
+        try:
             url = "https://drive-m.quark.cn/1/clouddrive/file/info/path_list"
             querystring = {"pr": "ucpro", "fr": "pc"}
             payload = {"file_path": batch, "namespace": "0"}
             headers = self.common_headers()
-            response = await fetch(session, "POST", url, json=payload, headers=headers, params=querystring)
+            response = await self.request(session, "POST", url, json=payload, headers=headers, params=querystring)
             if response and response["code"] == 0:
-                fids += response["data"]
+                found = {item["file_path"]: item["fid"] for item in response["data"]}
+                # 请求成功时不存在的目录也缓存，请求失败时不缓存，下次重新查询
+                expires = time.monotonic() + FID_CACHE_TTL
+                for file_path in batch:
+                    self.fid_cache[file_path] = (found.get(file_path), expires)
             else:
                 logging.error(f"获取目录ID失败: {response['message'] if response else '无响应'}")
-                break
-        return fids
+        finally:
+            for file_path in batch:
+                future = self.fid_pending.pop(file_path)
+                if not future.done():
+                    future.set_result(found.get(file_path))
+
+    def fid_missing(self, file_path):
+        """
+        path_list 已确认目录不存在（请求成功但结果中没有该目录）。
+        """
+        cached = self.fid_cache.get(file_path)
+        return bool(cached) and cached[0] is None and cached[1] > time.monotonic()
+
+    def cache_fid(self, file_path, fid):
+        self.fid_cache[file_path] = (fid, time.monotonic() + FID_CACHE_TTL)
+
+    def invalidate_fids(self, fids):
+        """
+        删除文件后清除这些 fid 对应的目录及其子目录的缓存。
+        """
+        fids = set(fids)
+        paths = [file_path for file_path, (fid, _) in self.fid_cache.items() if fid in fids]
+        for file_path in list(self.fid_cache):
+            if any(file_path == path or file_path.startswith(path.rstrip("/") + "/") for path in paths):
+                del self.fid_cache[file_path]
 
     async def ls_dir(self, session, pdir_fid):
+        file_list, _ = await self.list_dir(session, pdir_fid)
+        return file_list or []
+
+    async def list_dir(self, session, pdir_fid):
+        """
+        列出目录，返回 (文件列表, 目录是否已不存在)。
+        第一页请求失败时文件列表为 None；只有接口返回 FID_GONE_CODES 中的错误码时才认为目录已不存在。
+        """
         file_list = []
         page = 1
         while True:
@@ -289,15 +546,19 @@ class Quark:
                 "_sort": "file_type:asc,updated_at:desc",
             }
             headers = self.common_headers()
-            response = await fetch(session, "GET", url, headers=headers, params=querystring)
-            if response and response["data"]["list"]:
+            response = await self.request(session, "GET", url, headers=headers, params=querystring, api_errors=True)
+            if not response or response.get("code") != 0:
+                if page == 1:
+                    return None, bool(response) and response.get("code") in FID_GONE_CODES
+                break
+            if response["data"]["list"]:
                 file_list += response["data"]["list"]
                 page += 1
             else:
                 break
             if len(file_list) >= response["metadata"]["_total"]:
                 break
-        return file_list
+        return file_list, False
 
     async def save_file(self, session, fid_list, fid_token_list, to_pdir_fid, pwd_id, stoken):
         url = "https://drive-m.quark.cn/1/clouddrive/share/sharepage/save"
@@ -320,7 +581,7 @@ class Quark:
             "scene": "link",
         }
         headers = self.common_headers()
-        response = await fetch(session, "POST", url, json=payload, headers=headers, params=querystring)
+        response = await self.request(session, "POST", url, json=payload, headers=headers, params=querystring, api_errors=True)
         return response
 
     async def mkdir(self, session, dir_path):
@@ -333,7 +594,9 @@ class Quark:
             "dir_init_lock": False,
         }
         headers = self.common_headers()
-        response = await fetch(session, "POST", url, json=payload, headers=headers, params=querystring)
+        response = await self.request(session, "POST", url, json=payload, headers=headers, params=querystring)
+        if response and response.get("code") == 0:
+            self.cache_fid(dir_path, response["data"]["fid"])
         return response
 
     async def rename(self, session, fid, file_name):
@@ -341,7 +604,7 @@ class Quark:
         querystring = {"pr": "ucpro", "fr": "pc", "uc_param_str": ""}
         payload = {"fid": fid, "file_name": file_name}
         headers = self.common_headers()
-        response = await fetch(session, "POST", url, json=payload, headers=headers, params=querystring)
+        response = await self.request(session, "POST", url, json=payload, headers=headers, params=querystring)
         return response
 
     async def delete(self, session, filelist):
@@ -349,7 +612,9 @@ class Quark:
         querystring = {"pr": "ucpro", "fr": "pc", "uc_param_str": ""}
         payload = {"action_type": 2, "filelist": filelist, "exclude_fids": []}
         headers = self.common_headers()
-        response = await fetch(session, "POST", url, json=payload, headers=headers, params=querystring)
+        response = await self.request(session, "POST", url, json=payload, headers=headers, params=querystring)
+        if response and response.get("code") == 0:
+            self.invalidate_fids(filelist)
         return response
 
     async def recycle_list(self, session, page=1, size=30):
@@ -362,7 +627,7 @@ class Quark:
             "uc_param_str": "",
         }
         headers = self.common_headers()
-        response = await fetch(session, "GET", url, headers=headers, params=querystring)
+        response = await self.request(session, "GET", url, headers=headers, params=querystring)
         if response:
             return response["data"]["list"]
         else:
@@ -376,9 +641,114 @@ class Quark:
             "record_list": record_list,
         }
         headers = self.common_headers()
-        response = await fetch(session, "POST", url, json=payload, headers=headers, params=querystring)
+        response = await self.request(session, "POST", url, json=payload, headers=headers, params=querystring)
         return response
 
+    async def ls_share(self, session):
+        share_list = []
+        page = 1
+        while True:
+            url = "https://drive-m.quark.cn/1/clouddrive/share/mypage/detail"
+            querystring = {
+                "pr": "ucpro",
+                "fr": "pc",
+                "uc_param_str": "",
+                "_page": page,
+                "_size": "50",
+                "_order_field": "created_at",
+                "_order_type": "desc",
+                "_fetch_total": "1",
+                "_fetch_notify_follow": "1",
+            }
+            headers = self.common_headers()
+            response = await self.request(session, "GET", url, headers=headers, params=querystring)
+            if not response:
+                # 不完整的分享列表不能用来判断缓存的分享是否还有效
+                raise QuarkUnavailable("获取分享列表失败：无响应")
+            if response["data"]["list"]:
+                share_list += response["data"]["list"]
+                page += 1
+            else:
+                break
+            if len(share_list) >= response["metadata"]["_total"]:
+                break
+        return share_list
+
+    async def create_share(self, session, fid, title):
+        url = "https://drive-m.quark.cn/1/clouddrive/share"
+        querystring = {"pr": "ucpro", "fr": "pc", "uc_param_str": ""}
+        payload = {"fid_list": [fid], "title": title, "expired_type": 1, "url_type": 1}
+        headers = self.common_headers()
+        response = await self.request(session, "POST", url, json=payload, headers=headers, params=querystring)
+        if not response or response.get("code") != 0:
+            return False, response["message"] if response else "获取task_id失败"
+        # 分享是异步任务，任务完成后返回 share_id，再用 share_id 取分享链接
+        query_task_return = await self.query_task(session, response["data"]["task_id"])
+        share_id = (query_task_return or {}).get("data", {}).get("share_id")
+        if not share_id:
+            return False, "获取share_id失败"
+        url = "https://drive-m.quark.cn/1/clouddrive/share/password"
+        response = await self.request(session, "POST", url, json={"share_id": share_id}, headers=headers, params=querystring)
+        if response and response.get("code") == 0:
+            return True, response["data"]["share_url"]
+        else:
+            return False, "获取share_url失败"
+
+    async def syn_dir(self, session, fid):
+        dir_file_list = await self.ls_dir(session, fid)
+        return [{"name": item["file_name"], "fid": item["fid"]} for item in dir_file_list]
+
+    async def share_dir(self, session, fid, cached=None, concurrency=SHARE_CONCURRENCY):
+        """
+        分享 fid 目录下的每个文件夹，返回 ([{"name", "fid", "share_url", "cached"}], 失效的缓存 fid 列表)，
+        分享结果的顺序与目录一致。cached 为 {fid: share_url}，仍在已有分享中且有效的不再分享；
+        已取消、过期或被封禁的缓存链接视为失效，与没有缓存的文件夹一样先在已有分享中按 fid 查找，
+        仍然没有的才并发创建分享，失败的不在返回结果中。获取分享列表失败时沿用缓存。
+        """
+        cached = cached or {}
+        dir_list = await self.syn_dir(session, fid)
+        try:
+            live_shares = [share for share in await self.ls_share(session) if share_alive(share)]
+        except QuarkUnavailable as e:
+            logging.error(f"{e}，无法校验缓存的分享链接，沿用缓存")
+            live_shares = None
+        live_urls = {share["share_url"] for share in live_shares or [] if share.get("share_url")}
+        results = {}
+        stale = []
+        need_share_list = []
+        for item in dir_list:
+            share_url = cached.get(item["fid"])
+            if share_url and (live_shares is None or share_url in live_urls):
+                results[item["fid"]] = dict(item, share_url=share_url, cached=True)
+                continue
+            if share_url:
+                stale.append(item["fid"])
+                logging.info(f"【{item['name']}】缓存的分享链接已失效：{share_url}")
+            need_share_list.append(item)
+        if need_share_list:
+            # 缓存之外分享过的文件夹（例如缓存建立之前），直接使用已有的分享链接
+            share_urls = {
+                share["first_fid"]: share["share_url"]
+                for share in live_shares or []
+                if share.get("first_fid") and share.get("share_url")
+            }
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def share(item):
+                if share_urls.get(item["fid"]):
+                    results[item["fid"]] = dict(item, share_url=share_urls[item["fid"]], cached=False)
+                    return
+                async with semaphore:
+                    is_share, share_return = await self.create_share(session, item["fid"], item["name"])
+                if is_share:
+                    results[item["fid"]] = dict(item, share_url=share_return, cached=False)
+                    logging.info(f"【{item['name']}】分享成功：{share_return}")
+                else:
+                    logging.error(f"【{item['name']}】分享失败：{share_return}")
+
+            await asyncio.gather(*[share(item) for item in need_share_list])
+        return [results[item["fid"]] for item in dir_list if item["fid"] in results], stale
+
     async def update_savepath_fid(self, session, tasklist):
         dir_paths = [
             re.sub(r"/{2,}", "/", f"/{item['savepath']}")
@@ -391,6 +761,10 @@ class Quark:
         ]
         if not dir_paths:
             return False
+        # 已知 fid 的目录（跨运行保存在任务库中）不再查询，fid 失效时在列目录或转存时重新查询
+        dir_paths = [dir_path for dir_path in dict.fromkeys(dir_paths) if not self.savepath_fid.get(dir_path)]
+        if not dir_paths:
+            return True
         dir_paths_exist_arr = await self.get_fids(session, tuple(dir_paths))
         dir_paths_exist = [item["file_path"] for item in dir_paths_exist_arr]
         dir_paths_unexist = list(set(dir_paths) - set(dir_paths_exist) - set(["/"]))
@@ -411,6 +785,50 @@ class Quark:
         for dir_path in dir_paths_exist_arr:
             self.savepath_fid[dir_path["file_path"]] = dir_path["fid"]
 
+    async def get_savepath_fid(self, session, savepath, refresh=False):
+        """
+        保存目录的 fid，优先使用已知的 fid。
+        refresh 为真时说明接口报告已知的 fid 已不存在：重新查询，path_list 确认目录不存在时创建。
+        查询失败（网络错误等）时返回 None，已知的 fid 保持不变。
+        """
+        if not refresh and self.savepath_fid.get(savepath):
+            return self.savepath_fid[savepath]
+        if refresh:
+            self.fid_cache.pop(savepath, None)
+            logging.info(f"目录 {savepath} 的fid已失效，重新查询")
+        fids = await self.get_fids(session, (savepath,))
+        if fids:
+            fid = fids[0]["fid"]
+        elif not self.fid_missing(savepath):
+            # path_list 请求失败，不能确定目录是否存在
+            return None
+        elif refresh:
+            mkdir_return = await self.mkdir(session, savepath)
+            fid = mkdir_return["data"]["fid"] if mkdir_return and mkdir_return.get("code") == 0 else None
+        else:
+            fid = None
+        if fid:
+            self.savepath_fid[savepath] = fid
+        elif refresh:
+            self.savepath_fid.pop(savepath, None)
+        return fid
+
+    async def ls_savepath(self, session, savepath):
+        """
+        列出保存目录，返回 (fid, 文件列表)，无法列出时 fid 为 None。
+        file/sort 报告目录不存在时重新查询目录的 fid 后再列一次。
+        """
+        fid = await self.get_savepath_fid(session, savepath)
+        if not fid:
+            return None, []
+        dir_file_list, gone = await self.list_dir(session, fid)
+        if gone:
+            fid = await self.get_savepath_fid(session, savepath, refresh=True)
+            dir_file_list = (await self.list_dir(session, fid))[0] if fid else None
+        if dir_file_list is None:
+            return None, []
+        return fid, dir_file_list
+
     async def do_save_check(self, session, shareurl, savepath):
         try:
             pwd_id, pdir_fid = self.get_id_from_url(shareurl)
@@ -464,12 +882,17 @@ class Quark:
             return
 
         pwd_id, pdir_fid = self.get_id_from_url(task["shareurl"])
-        is_sharing, stoken = await self.get_stoken(session, pwd_id)
-        if not is_sharing:
-            add_notify(f"❌《{task['taskname']}》：{stoken}\n")
-            task["shareurl_ban"] = stoken
-            return
-        updated_tree = await self.dir_check_and_save(session, task, pwd_id, stoken, pdir_fid)
+        try:
+            is_sharing, stoken = await self.get_stoken(session, pwd_id)
+            if not is_sharing:
+                add_notify(f"❌《{task['taskname']}》：{stoken}\n")
+                task["shareurl_ban"] = stoken
+                return
+            updated_tree = await self.dir_check_and_save(session, task, pwd_id, stoken, pdir_fid)
+        except QuarkUnavailable as e:
+            # 接口暂时不可用，不能判断分享是否失效，本次跳过，不设置 shareurl_ban
+            add_notify(f"⚠️《{task['taskname']}》：{e}，本次跳过\n")
+            return False
         if updated_tree.size(1) > 0:
             add_notify(f"✅《{task['taskname']}》添加追更：\n{updated_tree}")
             return True
@@ -496,15 +919,10 @@ class Quark:
             share_file_list = await self.get_detail(session, pwd_id, stoken, share_file_list[0]["fid"])
 
         savepath = re.sub(r"/{2,}", "/", f"/{task['savepath']}{subdir_path}")
-        if not self.savepath_fid.get(savepath):
-            get_fids = await self.get_fids(session, (savepath,))
-            if get_fids:
-                self.savepath_fid[savepath] = get_fids[0]["fid"]
-            else:
-                logging.error(f"❌ 目录 {savepath} fid获取失败，跳过转存")
-                return tree
-        to_pdir_fid = self.savepath_fid[savepath]
-        dir_file_list = await self.ls_dir(session, to_pdir_fid)
+        to_pdir_fid, dir_file_list = await self.ls_savepath(session, savepath)
+        if not to_pdir_fid:
+            logging.error(f"❌ 目录 {savepath} fid获取失败，跳过转存")
+            return tree
 
         need_save_list = []
         for share_file in share_file_list:
@@ -560,6 +978,12 @@ class Quark:
         save_name_list = [item["save_name"] for item in need_save_list]
         if fid_list:
             save_file_return = await self.save_file(session, fid_list, fid_token_list, to_pdir_fid, pwd_id, stoken)
+            if save_file_return and save_file_return.get("code") in FID_GONE_CODES:
+                # 保存目录已被删除：重新查询目录的 fid，fid 有变化时重试一次
+                new_fid = await self.get_savepath_fid(session, savepath, refresh=True)
+                if new_fid and new_fid != to_pdir_fid:
+                    to_pdir_fid = new_fid
+                    save_file_return = await self.save_file(session, fid_list, fid_token_list, to_pdir_fid, pwd_id, stoken)
             err_msg = None
             if save_file_return and save_file_return.get("code") == 0:
                 task_id = save_file_return["data"]["task_id"]
@@ -598,7 +1022,7 @@ class Quark:
                 "__t": datetime.now().timestamp(),
             }
             headers = self.common_headers()
-            response = await fetch(session, "GET", url, headers=headers, params=querystring)
+            response = await self.request(session, "GET", url, headers=headers, params=querystring)
             if response:
                 if response["data"]["status"] != 0:
                     break
@@ -618,13 +1042,9 @@ class Quark:
         if not pattern or not replace:
             return False
         savepath = re.sub(r"/{2,}", "/", f"/{task['savepath']}{subdir_path}")
-        if not self.savepath_fid.get(savepath):
-            fids = await self.get_fids(session, (savepath,))
-            if fids:
-                self.savepath_fid[savepath] = fids[0]["fid"]
-            else:
-                return False
-        dir_file_list = await self.ls_dir(session, self.savepath_fid[savepath])
+        fid, dir_file_list = await self.ls_savepath(session, savepath)
+        if not fid:
+            return False
         dir_file_name_list = [item["file_name"] for item in dir_file_list]
         rename_tasks = []
         for dir_file in dir_file_list:
@@ -710,9 +1130,10 @@ async def do_save(session, account, tasklist=[]):
             )
         )
 
-    tasks = []
-    for index, task in enumerate(tasklist):
-        if check_date(task):
+    async def run_task(index, task, task_notifys):
+        # 在独立的 asyncio 任务中运行，通知只写入本任务的缓冲区
+        TASK_NOTIFYS.set(task_notifys)
+        async with semaphore:
             logging.info(f"#{index+1}------------------")
             logging.info(f"任务名称: {task['taskname']}")
             logging.info(f"分享链接: {task['shareurl']}")
@@ -727,6 +1148,7 @@ async def do_save(session, account, tasklist=[]):
                 logging.info(f"忽略后缀: {task['ignore_extension']}")
             if task.get("update_subdir"):
                 logging.info(f"更子目录: {task['update_subdir']}")
+            # 同一个任务内按 转存 -> 重命名 -> 刷新媒体库 的顺序执行
             is_new = await account.do_save_task(session, task)
             is_rename = await account.do_rename_task(session, task)
             if emby.is_active and (is_new or is_rename) and task.get("emby_id") != "0":
@@ -737,6 +1159,22 @@ async def do_save(session, account, tasklist=[]):
                     if match_emby_id:
                         task["emby_id"] = match_emby_id
                         await emby.refresh(session, match_emby_id)
+
+    concurrency = max(1, int(CONFIG_DATA.get("save_concurrency") or SAVE_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    task_notifys_list = []
+    tasks = []
+    for index, task in enumerate(tasklist):
+        if check_date(task):
+            task_notifys = []
+            task_notifys_list.append(task_notifys)
+            tasks.append(asyncio.create_task(run_task(index, task, task_notifys)))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    # 按任务顺序合并通知，与任务完成的先后无关
+    for task_notifys, result in zip(task_notifys_list, results):
+        if isinstance(result, Exception):
+            logging.error(f"转存任务出错: {result}")
+        NOTIFYS.extend(task_notifys)
     logging.info("转存任务完成")
 
 class Emby:
@@ -843,8 +1281,17 @@ async def main():
         logging.error("❌ cookie 未配置")
         return
 
+    # 任务保存在任务库中，记录运行前转存会修改的字段，结束时只把有变化的字段写回对应的行，
+    # 运行期间网页端或 movie_list 对任务的其他修改不会被覆盖
+    task_rows = []
+    if cookie_form_file:
+        with open_task_store(config_path, CONFIG_DATA) as store:
+            task_rows = store.tasks()
+        CONFIG_DATA["tasklist"] = [task for _, task in task_rows]
+    task_snapshots = [{key: task.get(key) for key in TASK_RESULT_FIELDS} for _, task in task_rows]
+
     async with aiohttp.ClientSession() as session:
-        accounts = [Quark(cookie, index) for index, cookie in enumerate(cookies)]
+        accounts = [Quark(cookie, index, CONFIG_DATA.get("rate_limit")) for index, cookie in enumerate(cookies)]
         logging.info("===============验证账号===============")
         verify_tasks = [verify_account(session, account) for account in accounts]
         await asyncio.gather(*verify_tasks)
@@ -853,6 +1300,10 @@ async def main():
         await asyncio.gather(*sign_tasks)
         logging.info("===============转存任务===============")
         if accounts[0].is_active and cookie_form_file:
+            # 保存目录的 fid 跨运行保存，启动时不再逐个查询
+            with open_task_store(config_path) as store:
+                accounts[0].savepath_fid.update(store.savepath_fids(accounts[0].uid))
+            savepath_fid_snapshot = dict(accounts[0].savepath_fid)
             tasklist = CONFIG_DATA.get("tasklist", [])
             if task_index is not None and 0 <= task_index < len(tasklist):
                 await do_save(session, accounts[0], [tasklist[task_index]])
@@ -863,11 +1314,23 @@ async def main():
             notify_body = "\n".join(NOTIFYS)
             await send_ql_notify("【夸克自动追更】", notify_body)
         if cookie_form_file:
-            with open(config_path, "w", encoding="utf-8") as file:
-                json.dump(CONFIG_DATA, file, ensure_ascii=False, indent=2)
+            with open_task_store(config_path) as store:
+                with store.transaction():
+                    for (task_id, task), snapshot in zip(task_rows, task_snapshots):
+                        fields = {key: task.get(key) for key in TASK_RESULT_FIELDS if task.get(key) != snapshot[key]}
+                        if fields:
+                            store.patch_task(task_id, fields)
+                if accounts[0].is_active:
+                    savepath_fid = accounts[0].savepath_fid
+                    store.save_savepath_fids(
+                        accounts[0].uid,
+                        {path: fid for path, fid in savepath_fid.items() if savepath_fid_snapshot.get(path) != fid},
+                        [path for path in savepath_fid_snapshot if path not in savepath_fid],
+                    )
     end_time = datetime.now()
     duration = end_time - start_time
     logging.info("===============程序结束===============")
+    logging.info(f"🌐 网络请求: {fetch_summary()}")
     logging.info(f"😃 运行时长: {round(duration.total_seconds(), 2)}s")
 
 if __name__ == "__main__":
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 自动分享：分享转存目录下的每个文件夹，并用分享链接替换影片目录中的夸克链接。
+# 用法：python3 quark_share.py <配置文件路径> --fid <转存目录的fid> [--concurrency N]
+# 已分享过的文件夹使用缓存的链接（保存在任务库中），只为新的文件夹和缓存链接已失效（不在我的分享中）的文件夹创建分享。
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import aiohttp
+from quark_auto_save import Quark, get_cookies, SHARE_CONCURRENCY
+from task_store import open_task_store
+
+# 影片目录由 auto 目录下的爬虫生成，读写接口也在那里
+AUTO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'auto')
+sys.path.insert(0, AUTO_DIR)
+from catalog import CATALOG_FILE
+from update_links import share_links, update_catalog
+
+
+async def share_main(config_path, fid, concurrency):
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    cookies = get_cookies(config.get('cookie'))
+    if not cookies:
+        print("错误: 配置文件中没有找到 cookie。")
+        return 1
+
+    account = Quark(cookies[0], 0, config.get('rate_limit'))
+    with open_task_store(config_path) as store:
+        async with aiohttp.ClientSession() as session:
+            if not await account.init(session):
+                print("错误: 账号验证失败，请检查cookie是否有效。")
+                return 1
+            shares, stale = await account.share_dir(session, fid, store.share_urls(), concurrency)
+        new_shares = [share for share in shares if not share['cached']]
+        if new_shares or stale:
+            store.save_shares(new_shares, removed=stale)
+    print(
+        f"共 {len(shares)} 个文件夹有分享链接，新增 {len(new_shares)} 个，使用缓存 {len(shares) - len(new_shares)} 个，"
+        f"失效的缓存链接 {len(stale)} 个。"
+    )
+
+    catalog_file = os.path.join(AUTO_DIR, CATALOG_FILE)
+    if not os.path.exists(catalog_file):
+        print(f"影片目录 {catalog_file} 不存在，跳过替换夸克链接。")
+        return 0
+    missing = update_catalog(catalog_file, share_links(shares))
+    if missing:
+        print(f'以下 {len(missing)} 部电影未找到夸克链接，未进行更新：')
+        print('\n'.join(missing))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分享转存目录下的文件夹并更新影片目录中的夸克链接')
+    parser.add_argument('config', help='配置文件路径')
+    parser.add_argument('--fid', required=True, help='转存目录的fid')
+    parser.add_argument('--concurrency', type=int, default=SHARE_CONCURRENCY, help='同时创建的分享数')
+    args = parser.parse_args()
+    sys.exit(asyncio.run(share_main(args.config, args.fid, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# 转存任务存储：任务保存在与配置文件同名的 SQLite 数据库中（quark_config.json -> quark_config.db），
+# cookie、推送、emby 等其他配置仍保存在 JSON 配置文件中。自动分享创建的分享链接和各账号保存目录的 fid 也缓存在这个数据库中。
+# 用法：python3 task_store.py export quark_config.json [输出文件]  导出包含 tasklist 的完整配置
+#       python3 task_store.py import quark_config.json 配置文件     用 JSON 中的 tasklist 替换任务库
+
+import os
+import sys
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+
+
+def store_path(config_path):
+    return os.path.splitext(config_path)[0] + ".db"
+
+
+def _dumps(task):
+    return json.dumps(task, ensure_ascii=False)
+
+
+class TaskStore:
+    """
+    每个任务一行，taskname 上有索引，按 id 保持任务顺序。
+    使用 WAL 模式，转存脚本、movie_list 和网页端可以同时读写，只更新各自修改的任务。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "taskname TEXT NOT NULL, "
+            "data TEXT NOT NULL, "
+            "updated_at INTEGER NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_taskname ON tasks (taskname)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS shares ("
+            "fid TEXT PRIMARY KEY, "
+            "name TEXT NOT NULL, "
+            "share_url TEXT NOT NULL, "
+            "updated_at INTEGER NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS savepath_fids ("
+            "account TEXT NOT NULL, "
+            "savepath TEXT NOT NULL, "
+            "fid TEXT NOT NULL, "
+            "updated_at INTEGER NOT NULL, "
+            "PRIMARY KEY (account, savepath))"
+        )
+
+    @contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def tasks(self):
+        """
+        返回 [(task_id, task)]，按添加顺序排列。
+        """
+        rows = self.conn.execute("SELECT id, data FROM tasks ORDER BY id")
+        return [(task_id, json.loads(data)) for task_id, data in rows]
+
+    def tasklist(self):
+        return [task for _, task in self.tasks()]
+
+    def find_task(self, taskname):
+        """
+        按任务名称查找，同名任务以第一个为准，返回 (task_id, task) 或 None。
+        """
+        row = self.conn.execute(
+            "SELECT id, data FROM tasks WHERE taskname = ? ORDER BY id LIMIT 1",
+            (taskname,),
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def add_task(self, task):
+        cursor = self.conn.execute(
+            "INSERT INTO tasks (taskname, data, updated_at) VALUES (?, ?, ?)",
+            (task.get("taskname", ""), _dumps(task), int(time.time())),
+        )
+        return cursor.lastrowid
+
+    def update_task(self, task_id, task):
+        self.conn.execute(
+            "UPDATE tasks SET taskname = ?, data = ?, updated_at = ? WHERE id = ?",
+            (task.get("taskname", ""), _dumps(task), int(time.time()), task_id),
+        )
+
+    def save_tasks(self, tasklist):
+        """
+        用完整的任务列表替换任务库（导入 JSON 时使用）：开头相同的任务保持不变，
+        从第一个不同的任务起删除原有的行并按顺序重新添加，行 id 不会指向另一个任务。
+        返回有变化的任务数。
+        """
+        with self.transaction():
+            existing = self.conn.execute("SELECT id, data FROM tasks ORDER BY id").fetchall()
+            same = 0
+            for (_, data), task in zip(existing, tasklist):
+                if data != _dumps(task):
+                    break
+                same += 1
+            self.delete_tasks([task_id for task_id, _ in existing[same:]])
+            for task in tasklist[same:]:
+                self.add_task(task)
+        return max(len(existing), len(tasklist)) - same
+
+    def upsert_tasks(self, tasklist):
+        """
+        按行 id 写入任务：带 _id 的任务更新对应的行（行已被删除时跳过），没有 _id 的任务作为新任务添加。
+        返回写入的任务数。
+        """
+        changed = 0
+        for task in tasklist:
+            task = dict(task)
+            task_id = task.pop("_id", None)
+            if task_id is None:
+                self.add_task(task)
+                changed += 1
+            elif self.conn.execute("SELECT 1 FROM tasks WHERE id = ?", (task_id,)).fetchone():
+                self.update_task(task_id, task)
+                changed += 1
+        return changed
+
+    def delete_tasks(self, task_ids):
+        self.conn.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in task_ids])
+
+    def patch_task(self, task_id, fields):
+        """
+        只修改任务的部分字段，其他字段保持任务库中的最新内容。行已被删除时返回 False。
+        """
+        row = self.conn.execute("SELECT data FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if not row:
+            return False
+        task = json.loads(row[0])
+        task.update(fields)
+        self.update_task(task_id, task)
+        return True
+
+    def share_urls(self):
+        """
+        已缓存的分享链接，返回 {fid: share_url}。
+        """
+        return dict(self.conn.execute("SELECT fid, share_url FROM shares"))
+
+    def save_shares(self, shares, removed=()):
+        """
+        缓存分享结果 [{"fid", "name", "share_url"}]，同一个 fid 只保留最新的链接，
+        并删除 removed 中链接已失效的 fid（同时在 shares 中的以新链接为准）。
+        """
+        with self.transaction():
+            self.conn.executemany(
+                "DELETE FROM shares WHERE fid = ?",
+                [(fid,) for fid in removed],
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO shares (fid, name, share_url, updated_at) VALUES (?, ?, ?, ?)",
+                [(share["fid"], share["name"], share["share_url"], int(time.time())) for share in shares],
+            )
+
+    def savepath_fids(self, account):
+        """
+        账号已知的保存目录 fid，返回 {savepath: fid}。
+        """
+        rows = self.conn.execute("SELECT savepath, fid FROM savepath_fids WHERE account = ?", (account,))
+        return dict(rows)
+
+    def save_savepath_fids(self, account, savepath_fids, removed=()):
+        """
+        写入有变化的保存目录 fid，并删除 removed 中已失效的目录。
+        """
+        with self.transaction():
+            now = int(time.time())
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO savepath_fids (account, savepath, fid, updated_at) VALUES (?, ?, ?, ?)",
+                [(account, savepath, fid, now) for savepath, fid in savepath_fids.items()],
+            )
+            self.conn.executemany(
+                "DELETE FROM savepath_fids WHERE account = ? AND savepath = ?",
+                [(account, savepath) for savepath in removed],
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _write_json(config_path, data, indent=2):
+    tmp_path = f"{config_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+    os.replace(tmp_path, config_path)
+
+
+def open_task_store(config_path, config=None):
+    """
+    打开配置文件对应的任务库。任务库不存在时从配置文件的 tasklist 导入，
+    并清空配置文件中的 tasklist，此后任务只保存在任务库中。
+    """
+    path = store_path(config_path)
+    is_new = not os.path.exists(path)
+    store = TaskStore(path)
+    if is_new:
+        if config is None and os.path.exists(config_path):
+            with open(config_path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        if config and config.get("tasklist"):
+            store.save_tasks(config["tasklist"])
+            _write_json(config_path, dict(config, tasklist=[]))
+    return store
+
+
+def read_config(config_path, with_ids=False):
+    """
+    读取完整配置，tasklist 来自任务库，格式与原来的 quark_config.json 相同。
+    with_ids 为真时每个任务带上行 id（_id），写回时用 write_config 按 id 更新。
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    with open_task_store(config_path, config) as store:
+        if with_ids:
+            config["tasklist"] = [dict(task, _id=task_id) for task_id, task in store.tasks()]
+        else:
+            config["tasklist"] = store.tasklist()
+    return config
+
+
+def write_config(config_path, config, removed_taskids=(), indent=2):
+    """
+    写入配置：tasklist 中的任务按行 id 更新或添加（见 upsert_tasks），删除 removed_taskids 中的任务，
+    tasklist 中没有的其他任务保持不变；其他配置写入 JSON 文件。
+    """
+    with open_task_store(config_path) as store:
+        with store.transaction():
+            store.upsert_tasks(config.get("tasklist", []))
+            store.delete_tasks(removed_taskids)
+    _write_json(config_path, dict(config, tasklist=[]), indent)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("export", "import"):
+        print("使用方法: python3 task_store.py export <配置文件路径> [输出文件]")
+        print("          python3 task_store.py import <配置文件路径> <包含 tasklist 的 JSON 文件>")
+        sys.exit(1)
+    config_path = sys.argv[2]
+    if sys.argv[1] == "export":
+        config = read_config(config_path)
+        output = json.dumps(config, ensure_ascii=False, indent=2)
+        if len(sys.argv) > 3:
+            with open(sys.argv[3], "w", encoding="utf-8") as f:
+                f.write(output)
+        else:
+            print(output)
+    else:
+        with open(sys.argv[3], "r", encoding="utf-8") as f:
+            tasklist = json.load(f).get("tasklist", [])
+        with open_task_store(config_path) as store:
+            changed = store.save_tasks(tasklist)
+        print(f"已导入 {len(tasklist)} 个任务，{changed} 个有变化。")
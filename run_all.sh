@@ -25,19 +25,12 @@ LOG_FILE="execution.log"
   echo "开始转存..."
   python3 quark_auto_save.py quark_config.json || echo "quark_auto_save.py 执行失败"
   
-  # 自动分享
+  # 自动分享并替换夸克网盘
   echo "开始自动分享..."
-  cd ../auto
-  php ./QuarkService.php --options syn_dir --fid 4a39e2d04e6c497f88184c58d8662f || echo "QuarkService.php syn_dir 执行失败"
-  php ./QuarkService.php --options share --fid 4a39e2d04e6c497f88184c58d8662f --type 'repeat' || echo "QuarkService.php share 执行失败"
-  
-  # 替换夸克网盘
-  echo "开始替换夸克网盘..."
-  python3 update_links.py || echo "update_links.py 执行失败"
+  python3 quark_share.py quark_config.json --fid 4a39e2d04e6c497f88184c58d8662f || echo "quark_share.py 执行失败"
   
   # 检查链接有效性
   echo "开始检查链接有效性..."
-  cd ../kua-main
   python3 check_movie_links.py quark_config.json || echo "check_movie_links.py 执行失败"
   
   # 生成html页面